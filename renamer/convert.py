@@ -2,7 +2,14 @@ from pathlib import Path
 import io
 import html
 import os
+import re
 import contextlib
+import gc
+import multiprocessing
+import zipfile
+import xml.etree.ElementTree as ET
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
 
 try:
     from ebooklib import epub
@@ -19,6 +26,8 @@ except ImportError:
 try:
     import fitz  # PyMuPDF
     _HAS_FITZ = True
+    # same flags as get_text('dict'), minus image blocks (only text is used)
+    _TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
 except Exception:
     _HAS_FITZ = False
 
@@ -41,8 +50,212 @@ try:
 except Exception:
     _HAS_BS4 = False
 
+try:
+    import lxml.html
+    _HAS_LXML = True
+except ImportError:
+    _HAS_LXML = False
+
+try:
+    import numpy as np
+    _HAS_NUMPY = True
+except ImportError:
+    _HAS_NUMPY = False
+
+_TAG_RE = re.compile(r'<[^>]+>')
+# html.escape() plus newline -> <br/> in a single str.translate pass
+_ESC = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;', '\n': '<br/>'})
+
+
+# above this many blocks a page is treated as graphics (plots, diagrams), not prose
+_MAX_PAGE_BLOCKS = 2000
+# page extraction is spread over processes only for documents this long,
+# with at least _PAGES_PER_WORKER pages per process
+_PARALLEL_MIN_PAGES = 200
+_PAGES_PER_WORKER = 50
+# pages processed between releases of MuPDF's object store (fonts, images, pages)
+_PAGE_SLOT = 500
+
+
+def _release_page_memory():
+    """Vacía la caché de MuPDF y recoge basura entre lotes de páginas."""
+    try:
+        fitz.TOOLS.store_shrink(100)
+    except Exception:
+        pass
+    gc.collect()
+
 
-def pdf_to_epub(pdf_path, epub_path, title=None, authors=None):
+# covers are at most this many pixels on the long side, JPEG quality 75
+_COVER_MAX = 1600
+_COVER_QUALITY = 75
+# XHTML is small and compresses well at level 1; images are already compressed
+_EPUB_COMPRESSLEVEL = 1
+_PRECOMPRESSED = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+class _EpubZip(zipfile.ZipFile):
+    """ZipFile que guarda sin comprimir los archivos ya comprimidos (imágenes)."""
+
+    def writestr(self, zinfo_or_arcname, data, compress_type=None, compresslevel=None):
+        if compress_type is None and isinstance(zinfo_or_arcname, str) \
+                and zinfo_or_arcname.lower().endswith(_PRECOMPRESSED):
+            compress_type = zipfile.ZIP_STORED
+        return super().writestr(zinfo_or_arcname, data, compress_type, compresslevel)
+
+
+# Chapters never carry epub:type="pagebreak" markers, so the nav page-list is
+# always empty; building it re-parses every chapter twice.
+_EPUB_WRITER_OPTIONS = {'epub3_pages': False}
+
+
+def _write_epub(epub_path, book):
+    """Como epub.write_epub, pero con DEFLATE rápido y errores propagados.
+
+    Drives EpubWriter's private `_write_*` steps; if an ebooklib release no
+    longer has them, falls back to the plain `epub.write_epub`.
+    """
+    try:
+        steps = (epub.EpubWriter._write_container, epub.EpubWriter._write_opf, epub.EpubWriter._write_items)
+    except AttributeError:
+        epub.write_epub(str(epub_path), book, _EPUB_WRITER_OPTIONS)
+        return
+    writer = epub.EpubWriter(str(epub_path), book, _EPUB_WRITER_OPTIONS)
+    writer.process()
+    writer.out = _EpubZip(str(epub_path), 'w', zipfile.ZIP_DEFLATED, compresslevel=_EPUB_COMPRESSLEVEL)
+    try:
+        writer.out.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+        for step in steps:
+            step(writer)
+    finally:
+        writer.out.close()
+
+
+def _pix_jpeg(pix):
+    try:
+        return pix.tobytes('jpg', jpg_quality=_COVER_QUALITY)
+    except TypeError:
+        # PyMuPDF before jpg_quality existed
+        return pix.tobytes('jpg')
+
+
+def _pix_image(pix):
+    """RGB Pillow image from a pixmap's raw samples."""
+    size = (pix.width, pix.height)
+    if pix.n == 3 and not pix.alpha:
+        return Image.frombytes('RGB', size, pix.samples)
+    if pix.n == 4:
+        return Image.frombuffer('RGBA', size, pix.samples_mv, 'raw', 'RGBA', pix.stride, 1).convert('RGB')
+    # gray (+alpha): the caller always renders RGB, this only guards odd pixmaps
+    mode = 'LA' if pix.alpha else 'L'
+    return Image.frombuffer(mode, size, pix.samples_mv, 'raw', mode, pix.stride, 1).convert('RGB')
+
+
+# sort key for (y0, size, text) page blocks
+_BY_Y0 = itemgetter(0)
+
+
+def _frequent(snips):
+    """Fragmentos (de más de 3 caracteres) presentes en al menos la mitad de `snips`."""
+    total = len(snips) or 1
+    counts = {}
+    found = set()
+    for s in snips:
+        if not s or len(s) <= 3 or s in found:
+            continue
+        c = counts.get(s, 0) + 1
+        # 2*c >= total is c/total >= 0.5 without float division
+        if 2 * c >= total:
+            found.add(s)
+        else:
+            counts[s] = c
+    return found
+
+
+def _extract_page_range(pdf_path, lo, hi):
+    """[(pno, parsed)] de las páginas lo..hi-1; corre en un proceso con su propio documento."""
+    doc = fitz.open(pdf_path)
+    try:
+        out = []
+        for pno in range(lo, hi):
+            if pno > lo and (pno - lo) % _PAGE_SLOT == 0:
+                _release_page_memory()
+            out.append((pno, _page_parsed(doc.load_page(pno))))
+        return out
+    finally:
+        doc.close()
+
+
+def _extract_pages_parallel(pdf_path, page_count):
+    """Reparte las páginas en rangos contiguos entre procesos; None si no compensa o falla."""
+    workers = min(os.cpu_count() or 1, page_count // _PAGES_PER_WORKER)
+    if workers < 2:
+        return None
+    step = -(-page_count // workers)
+    los = list(range(0, page_count, step))
+    his = [min(lo + step, page_count) for lo in los]
+    try:
+        # spawn: the GUI calls this from a worker thread, where fork is unsafe
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(los), mp_context=ctx) as ex:
+            chunks = ex.map(_extract_page_range, [pdf_path] * len(los), los, his)
+            return [item for chunk in chunks for item in chunk]
+    except Exception:
+        return None
+
+
+def _page_parsed(page, dl=None):
+    """(y0, tamaño, texto) de los bloques de una página, vía DisplayList si se puede.
+
+    Graphics-heavy pages (more than _MAX_PAGE_BLOCKS blocks) become a single
+    plain-text paragraph: per-block font sizes there are noise, not headings.
+    """
+    if page.rotation:
+        # a display list keeps the rotation; get_text() reports unrotated coordinates
+        blocks = page.get_text('dict', flags=_TEXT_FLAGS).get('blocks', [])
+        if len(blocks) > _MAX_PAGE_BLOCKS:
+            return _plain_text_block(page.get_text('text', flags=_TEXT_FLAGS))
+        return _parse_blocks(blocks)
+    if dl is None:
+        dl = page.get_displaylist()
+    tp = dl.get_textpage(flags=_TEXT_FLAGS)
+    if not isinstance(tp, fitz.TextPage):
+        # recent PyMuPDF returns the bare MuPDF object here
+        tp = fitz.TextPage(tp)
+    blocks = tp.extractDICT().get('blocks', [])
+    if len(blocks) > _MAX_PAGE_BLOCKS:
+        return _plain_text_block(tp.extractText())
+    return _parse_blocks(blocks)
+
+
+def _plain_text_block(text):
+    lines = [ln.strip() for ln in text.splitlines()]
+    text = '\n'.join(ln for ln in lines if ln)
+    return [(0, 0, text)] if text else []
+
+
+def _parse_blocks(blocks):
+    """Reduce los bloques de texto a tuplas (y0, tamaño máximo de fuente, texto)."""
+    parsed = []
+    for block in blocks:
+        if block.get('type') != 0:
+            continue
+        # one comprehension per block instead of a nested loop with per-span max()
+        spans = [(span.get('size', 0), txt)
+                 for line in block.get('lines', ())
+                 for span in line.get('spans', ())
+                 for txt in (span.get('text', '').strip(),) if txt]
+        if not spans:
+            continue
+        # MuPDF bboxes are always 4-tuples
+        bbox = block.get('bbox')
+        y0 = bbox[1] if bbox else 0
+        max_sz = max(0, max(sz for sz, _ in spans))
+        parsed.append((y0, max_sz, ' '.join(t for _, t in spans)))
+    return parsed
+
+
+def pdf_to_epub(pdf_path, epub_path, title=None, authors=None, doc=None):
     """Convert a PDF file to a simple EPUB.
 
     Args:
@@ -50,35 +263,21 @@ def pdf_to_epub(pdf_path, epub_path, title=None, authors=None):
         epub_path: path-like or str to target EPUB
         title: optional title string
         authors: optional list of author strings
+        doc: optional already-open fitz.Document for `pdf_path`; the caller
+            keeps ownership and closes it
 
     Returns:
         (True, None) on success or (False, error_message) on failure.
     """
     try:
-        if not _HAS_PYPDF2:
-            return False, "PyPDF2 is not installed."
+        if not (_HAS_FITZ or _HAS_PYPDF2):
+            return False, "PyMuPDF or PyPDF2 is required."
         if not _HAS_EBOOKLIB:
             return False, "EbookLib is not installed."
 
         pdf_path = Path(pdf_path)
         epub_path = Path(epub_path)
 
-        # suppress PyPDF2 stderr messages (xref warnings) while reading
-        import os
-        import contextlib
-        with open(os.devnull, 'w') as devnull:
-            with contextlib.redirect_stderr(devnull):
-                reader = PdfReader(str(pdf_path))
-        pages = []
-        for page in reader.pages:
-            try:
-                txt = page.extract_text() or ''
-            except Exception:
-                txt = ''
-            pages.append(txt)
-
-        full = '\n\n'.join([p for p in pages if p])
-
         book = epub.EpubBook()
         if title:
             book.set_title(title)
@@ -90,124 +289,139 @@ def pdf_to_epub(pdf_path, epub_path, title=None, authors=None):
             except Exception:
                 book.add_author(str(authors))
 
-        # try to extract first-page image as cover (optional, requires PyMuPDF)
-        reader = PdfReader(str(pdf_path))
-
         # If PyMuPDF is available, attempt a richer extraction: headings, paragraphs and images.
+        # A single document handle serves cover, text, TOC and the plain-text fallback.
         chapters = []
         # map PDF page index -> chapter index (used later to map TOC entries to chapter files)
         page_to_chap = {}
         cover_bytes = None
-        if _HAS_FITZ:
+        raw_toc = []
+        own_doc = doc is None
+        if _HAS_FITZ and own_doc:
             try:
                 doc = fitz.open(str(pdf_path))
-                # First, extract only the first page image as cover (JPEG for smaller size)
+            except Exception:
+                doc = None
+        try:
+            if doc is not None:
                 try:
-                    if doc.page_count > 0:
-                        p0 = doc.load_page(0)
-                        # render at a slightly higher resolution for decent results
-                        pix = p0.get_pixmap(matrix=fitz.Matrix(2, 2))
-                        try:
-                            png_bytes = pix.tobytes('png')
-                            if _HAS_PIL:
-                                img = Image.open(io.BytesIO(png_bytes)).convert('RGB')
-                                img.thumbnail((1600, 1600), Image.LANCZOS)
-                                out = io.BytesIO()
-                                img.save(out, format='JPEG', quality=75, optimize=True)
-                                cover_bytes = out.getvalue()
-                            else:
-                                # fallback to the raw JPEG bytes from PyMuPDF if Pillow not available
-                                cover_bytes = pix.tobytes('jpg')
-                        except Exception:
-                            # final fallback: try direct jpg bytes
+                    # First, extract only the first page image as cover (JPEG for smaller size)
+                    # page 0 is interpreted once: its display list also feeds the text pass
+                    dl0 = None
+                    try:
+                        if doc.page_count > 0:
+                            p0 = doc.load_page(0)
+                            dl0 = p0.get_displaylist()
+                            # render straight at the cover size (at most 2x, at most _COVER_MAX px)
+                            r = p0.rect
+                            zoom = min(2.0, _COVER_MAX / max(r.width, r.height, 1))
+                            pix = dl0.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
                             try:
-                                cover_bytes = pix.tobytes('jpg')
+                                if _HAS_PIL:
+                                    # raw samples straight into Pillow, no PNG encode/decode in between
+                                    img = _pix_image(pix)
+                                    img.thumbnail((_COVER_MAX, _COVER_MAX), Image.HAMMING)
+                                    out = io.BytesIO()
+                                    img.save(out, format='JPEG', quality=_COVER_QUALITY,
+                                             optimize=True, progressive=True)
+                                    cover_bytes = out.getvalue()
+                                else:
+                                    # fallback to the raw JPEG bytes from PyMuPDF if Pillow not available
+                                    cover_bytes = _pix_jpeg(pix)
                             except Exception:
-                                cover_bytes = None
-                except Exception:
-                    cover_bytes = None
-
-                # Collect small snippets at top/bottom of each page to detect headers/footers
-                page_blocks = []
-                top_snippets = []
-                bottom_snippets = []
-                for pno in range(doc.page_count):
-                    page = doc.load_page(pno)
-                    blocks = page.get_text('dict').get('blocks', [])
-                    parsed = []
-                    for block in blocks:
-                        if block.get('type') != 0:
-                            continue
-                        bbox = block.get('bbox', [])
-                        y0 = bbox[1] if len(bbox) >= 4 else 0
-                        max_sz = 0
-                        texts = []
-                        for line in block.get('lines', []):
-                            for span in line.get('spans', []):
-                                txt = span.get('text', '').strip()
-                                if not txt:
-                                    continue
-                                sz = span.get('size', 0)
-                                max_sz = max(max_sz, sz)
-                                texts.append((sz, txt))
-                        if not texts:
-                            continue
-                        txt_join = ' '.join(t for _, t in texts)
-                        parsed.append((y0, max_sz, txt_join))
-                    page_blocks.append((pno, parsed))
-                    if parsed:
-                        sorted_blocks = sorted(parsed, key=lambda x: x[0])
-                        top_snippets.append(' | '.join(b[2] for b in sorted_blocks[:2]))
-                        bottom_snippets.append(' | '.join(b[2] for b in sorted_blocks[-2:]))
-
-                # determine frequent headers/footers (appear on >=50% pages)
-                from collections import Counter
-                def frequent(snips):
-                    cnt = Counter(s for s in snips if s and len(s) > 3)
-                    total = len(snips) or 1
-                    return set(s for s, c in cnt.items() if c / total >= 0.5)
-
-                common_tops = frequent(top_snippets)
-                common_bottoms = frequent(bottom_snippets)
-
-                # Build chapters: only text, no images; headings detected by font size
-                for (pno, parsed) in page_blocks:
-                    page_html = ''
-                    for y0, max_sz, txt in parsed:
-                        # filter likely header/footer
-                        if txt in common_tops or txt in common_bottoms:
-                            continue
-                        if max_sz and max_sz >= 16:
-                            page_html += f"<h2>{html.escape(txt)}</h2>"
-                        else:
-                            page_html += f"<p>{html.escape(txt).replace('\n', '<br/>')}</p>"
-                    if page_html.strip():
-                        chapters.append((pno, page_html))
-
-                # attempt to extract table of contents (bookmarks)
-                try:
-                    raw_toc = doc.get_toc() or []
+                                # final fallback: try direct jpg bytes
+                                try:
+                                    cover_bytes = _pix_jpeg(pix)
+                                except Exception:
+                                    cover_bytes = None
+                    except Exception:
+                        cover_bytes = None
+
+                    # Collect small snippets at top/bottom of each page to detect headers/footers.
+                    # page_blocks keeps only (y0, size, text) per block; span dicts die with each page.
+                    page_blocks = None
+                    if doc.page_count >= _PARALLEL_MIN_PAGES and not doc.needs_pass:
+                        page_blocks = _extract_pages_parallel(str(pdf_path), doc.page_count)
+                    if page_blocks is None:
+                        page_blocks = []
+                        for pno in range(doc.page_count):
+                            if pno and pno % _PAGE_SLOT == 0:
+                                _release_page_memory()
+                            if pno == 0 and dl0 is not None:
+                                dl, dl0 = dl0, None
+                            else:
+                                dl = None
+                            page_blocks.append((pno, _page_parsed(doc.load_page(pno), dl)))
+                            dl = None
+                    top_snippets = []
+                    bottom_snippets = []
+                    for pno, parsed in page_blocks:
+                        if parsed:
+                            sorted_blocks = sorted(parsed, key=_BY_Y0)
+                            top_snippets.append(' | '.join(b[2] for b in sorted_blocks[:2]))
+                            bottom_snippets.append(' | '.join(b[2] for b in sorted_blocks[-2:]))
+
+                    # determine frequent headers/footers (appear on >=50% pages)
+                    # one set for both ends: a single lookup per block below
+                    common_chrome = _frequent(top_snippets) | _frequent(bottom_snippets)
+
+                    # Build chapters: only text, no images; headings detected by font size
+                    for (pno, parsed) in page_blocks:
+                        buf = []
+                        for y0, max_sz, txt in parsed:
+                            # filter likely header/footer
+                            if txt in common_chrome:
+                                continue
+                            if max_sz and max_sz >= 16:
+                                buf.append('<h2>' + html.escape(txt) + '</h2>')
+                            else:
+                                buf.append('<p>' + txt.translate(_ESC) + '</p>')
+                        page_html = ''.join(buf)
+                        if page_html.strip():
+                            chapters.append((pno, page_html))
+
+                    # attempt to extract table of contents (bookmarks)
+                    try:
+                        raw_toc = doc.get_toc() or []
+                    except Exception:
+                        raw_toc = []
                 except Exception:
-                    raw_toc = []
+                    chapters = []
+
+            # fallback: simple text extraction (one chapter)
+            if not chapters:
+                pages = []
+                if doc is not None:
+                    for i in range(doc.page_count):
+                        try:
+                            txt = doc.load_page(i).get_text() or ''
+                        except Exception:
+                            txt = ''
+                        pages.append(txt)
+                else:
+                    # suppress PyPDF2 stderr messages (xref warnings) while reading
+                    with open(os.devnull, 'w') as devnull:
+                        with contextlib.redirect_stderr(devnull):
+                            reader = PdfReader(str(pdf_path))
+                    for page in reader.pages:
+                        try:
+                            txt = page.extract_text() or ''
+                        except Exception:
+                            txt = ''
+                        pages.append(txt)
+                full = '\n\n'.join([p for p in pages if p])
+                paragraphs = ''.join('<p>' + p.translate(_ESC) + '</p>' for p in full.split('\n\n') if p.strip())
+                if title:
+                    chapters = [(0, f"<h1>{html.escape(title)}</h1>" + paragraphs)]
+                else:
+                    chapters = [(0, paragraphs)]
+        finally:
+            if own_doc and doc is not None:
                 doc.close()
-            except Exception:
-                chapters = []
 
-        # fallback: simple text extraction (one chapter)
-        if not chapters:
-            pages = []
-            for page in reader.pages:
-                try:
-                    txt = page.extract_text() or ''
-                except Exception:
-                    txt = ''
-                pages.append(txt)
-            full = '\n\n'.join([p for p in pages if p])
-            paragraphs = ''.join(f"<p>{html.escape(p).replace('\\n', '<br/>')}</p>" for p in full.split('\n\n') if p.strip())
-            if title:
-                chapters = [(0, f"<h1>{html.escape(title)}</h1>" + paragraphs)]
-            else:
-                chapters = [(0, paragraphs)]
+        # no text at all (e.g. a scanned PDF) is a failed conversion, not an empty book
+        if not any(ch_html for _, ch_html in chapters):
+            return False, 'No text extracted from PDF.'
 
         # build EPUB chapters/items
         spine = ['nav']
@@ -233,7 +447,7 @@ def pdf_to_epub(pdf_path, epub_path, title=None, authors=None):
                 pass
 
         # If we have a PDF TOC (bookmarks) from PyMuPDF, build a nested EPUB TOC mapping bookmark page -> chapter
-        if _HAS_FITZ and 'raw_toc' in locals() and raw_toc:
+        if raw_toc:
             toc_entries = []
             stack = [(0, toc_entries)]
             # raw_toc entries are [level, title, page], page is 1-based
@@ -273,7 +487,7 @@ def pdf_to_epub(pdf_path, epub_path, title=None, authors=None):
         # write output
         epub_path.parent.mkdir(parents=True, exist_ok=True)
         try:
-            epub.write_epub(str(epub_path), book)
+            _write_epub(epub_path, book)
             return True, None
         except Exception as e:
             msg = str(e)
@@ -284,7 +498,89 @@ def pdf_to_epub(pdf_path, epub_path, title=None, authors=None):
         return False, str(e)
 
 
+# below this many parts the numpy setup costs more than the Python loop
+_NUMPY_MIN_PARTS = 256
+
+
+def _heading_candidates(parts):
+    """Índices de bloques cortos (<120) seguidos de uno largo (>40): posibles títulos."""
+    n = len(parts)
+    if _HAS_NUMPY and n >= _NUMPY_MIN_PARTS:
+        lens = np.fromiter(map(len, parts), dtype=np.int64, count=n)
+        mask = lens < 120
+        mask[:-1] &= lens[1:] > 40
+        mask[-1] = False
+        return np.flatnonzero(mask).tolist()
+    return [i for i in range(n - 1) if len(parts[i]) < 120 and len(parts[i + 1]) > 40]
+
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_P = _W + 'p'
+_W_R = _W + 'r'
+_W_T = _W + 't'
+_W_BR = _W + 'br'
+_W_HYPERLINK = _W + 'hyperlink'
+# run children with a fixed text equivalent (same mapping as python-docx Run.text)
+_W_RUN_TEXT = {_W + 'tab': '\t', _W + 'ptab': '\t', _W + 'cr': '\n', _W + 'noBreakHyphen': '-'}
+
+
+def _docx_run_text(r):
+    out = []
+    for e in r:
+        tag = e.tag
+        if tag == _W_T:
+            out.append(e.text or '')
+        elif tag == _W_BR:
+            # only line breaks; page/column breaks have no text
+            if e.get(_W + 'type', 'textWrapping') == 'textWrapping':
+                out.append('\n')
+        else:
+            t = _W_RUN_TEXT.get(tag)
+            if t:
+                out.append(t)
+    return ''.join(out)
+
+
+def _docx_paragraph_text(p):
+    out = []
+    for child in p:
+        if child.tag == _W_R:
+            out.append(_docx_run_text(child))
+        elif child.tag == _W_HYPERLINK:
+            out.extend(_docx_run_text(r) for r in child if r.tag == _W_R)
+    return ''.join(out)
+
+
+def _extract_text_from_docx_xml(path):
+    """Párrafos del cuerpo leyendo word/document.xml en streaming (sin python-docx).
+
+    Only direct children of w:body are paragraphs, like `Document.paragraphs`;
+    each one is cleared once read so the tree never grows past one paragraph.
+    """
+    parts = []
+    depth = 0
+    with zipfile.ZipFile(str(path)) as z, z.open('word/document.xml') as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 2:
+                # w:document > w:body > elem
+                if elem.tag == _W_P:
+                    t = _docx_paragraph_text(elem).strip()
+                    if t:
+                        parts.append(t)
+                elem.clear()
+    return parts
+
+
 def _extract_text_from_docx(path):
+    try:
+        return _extract_text_from_docx_xml(path)
+    except Exception:
+        pass
+    # malformed package: let python-docx have a go
     parts = []
     if not _HAS_DOCX:
         return parts
@@ -300,31 +596,25 @@ def _extract_text_from_docx(path):
 
 
 def _extract_cover_from_docx(path):
-    if not _HAS_DOCX:
-        return None
     try:
-        doc = docx.Document(str(path))
-        blobs = []
-        for rel in getattr(doc.part, 'rels', {}).values():
-            try:
-                part = getattr(rel, 'target_part', None)
-                if part is None:
-                    continue
-                blob = getattr(part, 'blob', None)
-                if blob:
-                    blobs.append(blob)
-            except Exception:
-                continue
-        if not blobs:
-            return None
-        # choose largest image (likely cover)
-        blob = max(blobs, key=len)
+        # images live under word/media/; only the central directory is consulted
+        # to pick one, no XML part is parsed
+        with zipfile.ZipFile(str(path)) as z:
+            media = [i for i in z.infolist() if i.filename.startswith('word/media/')]
+            if not media:
+                return None
+            # choose largest image (likely cover)
+            blob = z.read(max(media, key=lambda i: i.file_size))
         if _HAS_PIL:
             try:
-                img = Image.open(io.BytesIO(blob)).convert('RGB')
-                img.thumbnail((1600, 1600), Image.LANCZOS)
+                img = Image.open(io.BytesIO(blob))
+                # JPEG only: let the decoder downscale by 1/2, 1/4 or 1/8 while decoding
+                img.draft('RGB', (_COVER_MAX, _COVER_MAX))
+                img = img.convert('RGB')
+                # after draft the remaining reduction is small, bicubic is enough
+                img.thumbnail((_COVER_MAX, _COVER_MAX), Image.BICUBIC)
                 out = io.BytesIO()
-                img.save(out, format='JPEG', quality=75, optimize=True)
+                img.save(out, format='JPEG', quality=_COVER_QUALITY, optimize=True, progressive=True)
                 return out.getvalue()
             except Exception:
                 return blob
@@ -339,6 +629,17 @@ def _extract_text_from_html(path):
         txt = Path(path).read_text(encoding='utf-8', errors='ignore')
     except Exception:
         return parts
+    if _HAS_LXML:
+        # lxml parses in C; much faster than BeautifulSoup with html.parser
+        try:
+            tree = lxml.html.fromstring(txt)
+            for tag in tree.iter('h1', 'h2', 'h3', 'p'):
+                text = tag.text_content().strip()
+                if text:
+                    parts.append(text)
+            return parts
+        except Exception:
+            parts = []
     if _HAS_BS4:
         try:
             soup = BeautifulSoup(txt, 'html.parser')
@@ -351,8 +652,7 @@ def _extract_text_from_html(path):
         except Exception:
             pass
     # fallback simple tag stripping
-    import re
-    txt = re.sub(r'<[^>]+>', '\n', txt)
+    txt = _TAG_RE.sub('\n', txt)
     for para in txt.split('\n'):
         p = para.strip()
         if p:
@@ -380,15 +680,27 @@ def convert_to_epub(input_path, epub_path, title=None, authors=None):
 
     p = Path(input_path)
     suffix = p.suffix.lower()
-    # If PDF, try our existing converter first
+    # If PDF, try our existing converter first; the document is opened once and
+    # shared with the text fallback below instead of re-parsing the xref
+    doc = None
     if suffix == '.pdf':
-        ok, err = pdf_to_epub(p, epub_path, title=title, authors=authors)
+        if _HAS_FITZ:
+            try:
+                doc = fitz.open(str(p))
+            except Exception:
+                doc = None
+        try:
+            ok, err = pdf_to_epub(p, epub_path, title=title, authors=authors, doc=doc)
+        except Exception:
+            ok = False
         if ok:
+            if doc is not None:
+                doc.close()
             return True, None
         # if PDF failed due to corruption, try fitz-based extraction or fallback to text
     # For other formats, extract text into chapters
     parts = []
-    if suffix in ('.docx',) and _HAS_DOCX:
+    if suffix in ('.docx',):
         # attempt to extract a cover image from docx
         cover_bytes = _extract_cover_from_docx(p)
         parts = _extract_text_from_docx(p)
@@ -398,17 +710,20 @@ def convert_to_epub(input_path, epub_path, title=None, authors=None):
         parts = _extract_text_from_txt(p)
     else:
         # try best-effort: if it's a PDF but pdf_to_epub failed, try fitz extraction
-        if _HAS_FITZ and suffix == '.pdf':
+        if doc is not None:
             try:
-                doc = fitz.open(str(p))
                 parts = []
                 for page in doc:
                     t = page.get_text().strip()
                     if t:
                         parts.append(t)
-                doc.close()
             except Exception:
                 parts = []
+            finally:
+                doc.close()
+        elif _HAS_FITZ and suffix == '.pdf':
+            # fitz could not even open it
+            parts = []
         else:
             # unknown type: try reading as text
             parts = _extract_text_from_txt(p)
@@ -419,6 +734,8 @@ def convert_to_epub(input_path, epub_path, title=None, authors=None):
     # build minimal chapters: split parts into chapters by detecting headings
     # Pre-filter parts: remove empty, duplicates, and parts equal to title/author
     clean_parts = []
+    # escaped once here; flushes below only join slices of this list
+    clean_parts_escaped = []
     seen = None
     title_norm = (title or '').strip().lower()
     authors_text = ''
@@ -439,35 +756,36 @@ def convert_to_epub(input_path, epub_path, title=None, authors=None):
         if s == seen:
             continue
         clean_parts.append(s)
+        clean_parts_escaped.append(s.translate(_ESC))
         seen = s
 
     chapters = []
-    cur = []
+    # paragraphs since the last heading are clean_parts[flush_lo:i]
+    flush_lo = 0
     chap_idx = 0
+    seen_headings = set()
     n = len(clean_parts)
-    for i, block in enumerate(clean_parts):
-        is_heading = False
-        if len(block) < 120 and (block.isupper() or block.istitle() or block.endswith(':')):
-            # check next block to ensure heading has content following
-            next_block = clean_parts[i+1] if i+1 < n else ''
-            if next_block and len(next_block) > 40:
-                is_heading = True
-        if is_heading:
+    # only the length-qualified blocks need the string checks; everything else
+    # is a paragraph and is picked up by the slice flushes
+    for i in _heading_candidates(clean_parts):
+        block = clean_parts[i]
+        if block.isupper() or block.istitle() or block.endswith(':'):
             # flush current paragraph group
-            if cur:
-                ch_html = '<p>' + '</p><p>'.join(html.escape(x).replace('\n', '<br/>') for x in cur) + '</p>'
+            if flush_lo < i:
+                ch_html = '<p>' + '</p><p>'.join(clean_parts_escaped[flush_lo:i]) + '</p>'
                 chapters.append((chap_idx, ch_html))
                 chap_idx += 1
-                cur = []
-            # add heading as its own chapter header (but only if not too repetitive)
+                seen_headings.clear()
+            flush_lo = i + 1
+            # add heading as its own chapter header (but only if not too repetitive:
+            # the same heading twice with no text in between is kept once)
             h = html.escape(block)
-            if not chapters or (chapters and chapters[-1][1].find(h) == -1):
+            if h not in seen_headings:
+                seen_headings.add(h)
                 chapters.append((chap_idx, f"<h2>{h}</h2>"))
                 chap_idx += 1
-        else:
-            cur.append(block)
-    if cur:
-        ch_html = '<p>' + '</p><p>'.join(html.escape(x).replace('\n', '<br/>') for x in cur) + '</p>'
+    if flush_lo < n:
+        ch_html = '<p>' + '</p><p>'.join(clean_parts_escaped[flush_lo:]) + '</p>'
         chapters.append((chap_idx, ch_html))
 
     # build EPUB
@@ -511,7 +829,7 @@ def convert_to_epub(input_path, epub_path, title=None, authors=None):
     epub_path = Path(epub_path)
     epub_path.parent.mkdir(parents=True, exist_ok=True)
     try:
-        epub.write_epub(str(epub_path), book)
+        _write_epub(epub_path, book)
         return True, None
     except Exception as e:
         msg = str(e)
@@ -5,28 +5,111 @@ externa e indexado incremental sobre SQLite.
 """
 
 import os
-import re
-import shutil
 import threading
-import hashlib
-import importlib.util
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from pathlib import Path
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from .utils import sanitize, normalize_authors, format_authors_for_filename, human_readable_size
-from .metadata import extract_metadata
-from .convert import pdf_to_epub, convert_to_epub
-from .infer import suggest_for_file
-import sqlite3
-from .index import db_exists, files_in_folder, DB_PATH
+from .utils import sanitize, normalize_authors, format_authors_for_filename, format_proposal, human_readable_size, iter_files
+from .infer import process_file, suggest_cache_key, load_suggest_cache, save_suggest_cache
+from .index import db_exists, files_in_folder, stats_for_paths, digests_for_sizes, shared_writer, write_lock
+from .hashing import file_hash, head_hash, cache_key, load_hash_cache, save_hash_cache, use_hash_algo, HASH_ALGO
 
 if TYPE_CHECKING:
     # Sólo para análisis estático; en ejecución se carga dinámicamente
     from scripts import indexer  # type: ignore
 
+# hashing and file reads release the GIL: threads are enough for those
+_THREAD_WORKERS = min(16, (os.cpu_count() or 4) * 2)
+# pools that only read and hash spend most of their time waiting on the disk,
+# so more threads than cores keep the I/O queue full
+_IO_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+# below this many files, starting worker processes costs more than it saves
+PROCESS_POOL_MIN_FILES = 200
+# scan workers hand rows to the Tk thread once this many are ready, or after
+# this long, so the UI wakes up per batch rather than per file
+_BATCH_ROWS = 200
+_BATCH_SECONDS = 0.1
+# batches smaller than this are inserted with the tree still mapped
+_DETACH_MIN_ROWS = 20
+# Treeview items are created lazily: this many rows up front and another chunk
+# whenever the view gets near the last created row. Entries past that point
+# live only in self.entries (and the hash index) until scrolled to.
+_MATERIALIZE_CHUNK = 500
+# the incremental scan writes changed files to the index in transactions of this many rows
+_UPSERT_BATCH = 1000
+_UPSERT_SQL = ('INSERT OR REPLACE INTO files(path,relpath,size,mtime,sha256,hash_algo,title,authors,indexed_at) '
+               'VALUES(?,?,?,?,?,?,?,?,?)')
+# the incremental scan looks up this many walked paths per index query
+_LOOKUP_CHUNK = 500
+# refreshing more rows than this also hides the columns until done
+_HIDE_COLUMNS_MIN_ROWS = 500
+# 'dup' is the only tag rows carry, so tags are set outright, never read back
+_DUP_TAGS = ('dup',)
+# acciones del diálogo de conflictos con la biblioteca, en el orden en que rotan
+_LIB_DUP_ACTIONS = (
+    ('keep_remote', 'Conservar BIBLIOTECA (Borrar local)'),
+    ('keep_local', 'Conservar LOCAL (Borrar de biblioteca)'),
+    ('keep_both', 'Conservar ambos (No hacer nada)'),
+)
+
+# Paleta oscura
+_WINDOW_BG = '#18151c'  # frames (very dark)
+_APP_BG = '#1f1b22'  # root window, buttons and label frames
+# Accent color (brighter violeta for better legibility)
+_ACCENT = '#a46bff'
+# Dialog-specific palette for contrasty cards
+_DIALOG_BG = '#0f0c12'
+_DIALOG_CARD_BG = '#1d1821'
+_DIALOG_TEXT = '#f4f0ff'
+
+# ttk styles, each configured once at startup by _apply_theme
+_STYLES = {
+    # Base widget backgrounds
+    'TFrame': {'background': _WINDOW_BG},
+    'TLabel': {'background': _WINDOW_BG, 'foreground': '#f0ecf7'},
+    'TButton': {'background': _APP_BG, 'foreground': '#f0ecf7'},
+    'TLabelframe': {'background': _APP_BG},
+    'TLabelframe.Label': {'background': _APP_BG, 'foreground': '#f0ecf7'},
+    # Treeview: dark rows with lighter text, higher-contrast heading
+    'Treeview': {'background': '#211c24', 'fieldbackground': '#211c24', 'foreground': '#f3ecff'},
+    'Treeview.Heading': {'background': '#3f334a', 'foreground': '#ffffff'},
+    # Accent frame/label/button styles
+    'Accent.TFrame': {'background': '#2a2132'},
+    'Accent.TLabel': {'background': '#2a2132', 'foreground': '#f8f2ff'},
+    'Accent.TButton': {'background': _ACCENT, 'foreground': '#0c0812'},
+    # Rounded button styles: neutral and accent variants (dark)
+    'Rounded.TButton': {'background': '#2b2630', 'foreground': '#f3ecff', 'relief': 'flat', 'padding': (8, 6), 'borderwidth': 1},
+    'RoundedAccent.TButton': {'background': _ACCENT, 'foreground': '#120a1c', 'relief': 'flat', 'padding': (8, 6), 'borderwidth': 1},
+    # Dialog specific styles
+    'Dialog.TFrame': {'background': _DIALOG_BG},
+    'Dialog.TLabelframe': {'background': _DIALOG_CARD_BG, 'borderwidth': 1, 'relief': 'solid'},
+    'Dialog.TLabelframe.Label': {'background': _DIALOG_CARD_BG, 'foreground': _DIALOG_TEXT},
+    'Dialog.TLabel': {'background': _DIALOG_CARD_BG, 'foreground': _DIALOG_TEXT},
+    'Dialog.TRadiobutton': {'background': _DIALOG_CARD_BG, 'foreground': _DIALOG_TEXT},
+}
+_STYLE_MAPS = {
+    'Rounded.TButton': {'background': [('active', '#3a3242')]},
+    'RoundedAccent.TButton': {'background': [('active', '#8b57e0')]},
+    'Dialog.TRadiobutton': {'background': [('active', '#2a2230')], 'foreground': [('active', '#ffffff')]},
+}
+
+
+def _apply_theme(style):
+    """Tema 'default' con la paleta oscura: una llamada por estilo."""
+    try:
+        style.theme_use('default')
+    except Exception:
+        pass
+    for name, cfg in _STYLES.items():
+        style.configure(name, **cfg)
+    for name, cfg in _STYLE_MAPS.items():
+        style.map(name, **cfg)
+
 
 class RenamerApp:
     """Ventana principal: lista archivos, sugiere nombres y gestiona acciones."""
@@ -35,78 +118,11 @@ class RenamerApp:
         self.root = root
         root.title('Renombrador por Autor y Título')
         # Apply dark theme colors and ttk styles for a modern, low-light UI
-        bg = '#18151c'  # main window background (very dark)
-        # Accent color (brighter violeta for better legibility)
-        accent = '#a46bff'
-        # Dialog-specific palette for contrasty cards
-        dialog_bg = '#0f0c12'
-        dialog_card_bg = '#1d1821'
-        dialog_text = '#f4f0ff'
-        dialog_muted = '#cfc7dd'
-        dialog_local = '#9ad5ff'
-        dialog_remote = '#f7b87b'
-        try:
-            root.configure(bg=bg)
-        except Exception:
-            pass
-        style = ttk.Style()
-        try:
-            style.theme_use('default')
-        except Exception:
-            pass
-        # Base widget backgrounds
-        style.configure('TFrame', background=bg)
-        style.configure('TLabel', background=bg, foreground='#f0ecf7')
-        style.configure('TButton', background=bg, foreground='#f0ecf7')
-        # Treeview: dark rows with lighter text, higher-contrast heading
-        style.configure('Treeview', background='#211c24', fieldbackground='#211c24', foreground='#f3ecff')
-        style.configure('Treeview.Heading', background='#3f334a', foreground='#ffffff')
-        # Accent frame/label/button styles
-        style.configure('Accent.TFrame', background='#2a2132')
-        style.configure('Accent.TLabel', background='#2a2132', foreground='#f8f2ff')
-        style.configure('Accent.TButton', background=accent, foreground='#0c0812')
-        self._app_bg = bg
-        self._accent = accent
-        # Dialog colors stored for reuse
-        self._dialog_bg = dialog_bg
-        self._dialog_card_bg = dialog_card_bg
-        self._dialog_text = dialog_text
-        self._dialog_muted = dialog_muted
-        self._dialog_local = dialog_local
-        self._dialog_remote = dialog_remote
-        # App-wide darker background used for additional style touches
-        self.bg_color = '#1f1b22'
-        try:
-            # Ensure common ttk widget backgrounds align with dark theme
-            try:
-                style.theme_use(style.theme_use())
-            except Exception:
-                pass
-            style.configure('TLabelframe', background=self.bg_color)
-            style.configure('TLabelframe.Label', background=self.bg_color, foreground='#f0ecf7')
-            style.configure('TButton', background=self.bg_color, foreground='#f0ecf7')
-            style.configure('Treeview', background='#211c24', fieldbackground='#211c24', foreground='#f3ecff')
-        except Exception:
-            pass
         try:
-            root.configure(bg=self.bg_color)
-        except Exception:
-            pass
-        # Rounded button styles: neutral and accent variants (dark)
-        try:
-            style.configure('Rounded.TButton', background='#2b2630', foreground='#f3ecff', relief='flat', padding=(8,6), borderwidth=1)
-            style.map('Rounded.TButton', background=[('active', '#3a3242')])
-            style.configure('RoundedAccent.TButton', background=self._accent, foreground='#120a1c', relief='flat', padding=(8,6), borderwidth=1)
-            style.map('RoundedAccent.TButton', background=[('active', '#8b57e0')])
-            # Dialog specific styles
-            style.configure('Dialog.TFrame', background=self._dialog_bg)
-            style.configure('Dialog.TLabelframe', background=self._dialog_card_bg, borderwidth=1, relief='solid')
-            style.configure('Dialog.TLabelframe.Label', background=self._dialog_card_bg, foreground=self._dialog_text)
-            style.configure('Dialog.TLabel', background=self._dialog_card_bg, foreground=self._dialog_text)
-            style.configure('Dialog.TRadiobutton', background=self._dialog_card_bg, foreground=self._dialog_text)
-            style.map('Dialog.TRadiobutton', background=[('active', '#2a2230')], foreground=[('active', '#ffffff')])
+            root.configure(bg=_APP_BG)
         except Exception:
             pass
+        _apply_theme(ttk.Style())
         self.folder = tk.StringVar()
         # hilo de escaneo actual (para evitar overlaps)
         self._scan_thread = None
@@ -136,10 +152,14 @@ class RenamerApp:
         self.tree.heading('orig', text='Original')
         self.tree.heading('new', text='Propuesto')
         self.tree.heading('size', text='Tamaño')
+        # rows sharing a content hash (see _dup_index); dark red to suit the dark theme
+        self.tree.tag_configure('dup', background='#442222')
 
         vs = ttk.Scrollbar(tree_frame, orient='vertical', command=self.tree.yview)
         hs = ttk.Scrollbar(tree_frame, orient='horizontal', command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vs.set, xscrollcommand=hs.set)
+        self.tree.configure(yscrollcommand=self._on_yscroll, xscrollcommand=hs.set)
+        self._vscroll = vs
+        self._hscroll = hs
 
         # layout with grid so scrollbars align
         self.tree.grid(row=0, column=0, sticky='nsew')
@@ -148,33 +168,28 @@ class RenamerApp:
         tree_frame.rowconfigure(0, weight=1)
         tree_frame.columnconfigure(0, weight=1)
 
-        # mouse wheel scrolling (Windows/Mac/Linux adjustments)
-        def _on_mousewheel(event):
-            # Windows: event.delta is multiple of 120
-            delta = 0
-            try:
-                delta = int(-1 * (event.delta / 120))
-            except Exception:
-                # Linux: event.num 4/5
-                if hasattr(event, 'num'):
-                    if event.num == 4:
-                        delta = -1
-                    elif event.num == 5:
-                        delta = 1
-            if delta:
-                self.tree.yview_scroll(delta, 'units')
-
-        # bind wheel to tree
-        self.tree.bind('<MouseWheel>', _on_mousewheel)
-        self.tree.bind('<Button-4>', _on_mousewheel)
-        self.tree.bind('<Button-5>', _on_mousewheel)
+        # bind wheel to tree (Windows/Mac: <MouseWheel>, X11: buttons 4/5)
+        for seq in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(seq, self._on_wheel)
 
         # (no preview panel)
 
         # mapping from tree item id to entries index
         self.item_map = {}
         self.entries = []
+        # and back: iid of entries[i] for every i < _shown (a column next to entries)
+        self._row_iids = []
         self._next_iid = 0
+        # entries[:_shown] have a tree item; entries[:_flushed] are ready to get one
+        self._shown = 0
+        self._flushed = 0
+        self._show_limit = _MATERIALIZE_CHUNK
+        # first iid seen per content hash (duplicate tagging while inserting)
+        self._hash_iids = {}
+        # content hash -> entries indices, kept up to date as rows are added
+        self._dup_index = {}
+        # model suggestions by content hash + name, loaded on the first model run
+        self._suggest_cache = None
         # UI bindings
         self.tree.bind('<<TreeviewSelect>>', lambda e: self.on_select())
         self._editing_entry = None
@@ -222,6 +237,7 @@ class RenamerApp:
         
         def run_indexer():
             try:
+                import importlib.util
                 root_proj = Path(__file__).resolve().parent.parent
                 idx_path = root_proj / 'scripts' / 'indexer.py'
 
@@ -254,46 +270,67 @@ class RenamerApp:
         t.start()
 
     def check_library_duplicates(self):
-        """Compara hashes locales contra la biblioteca indexada y ofrece resolución."""
-        from .index import find_files_by_hash
-        # Collect current hashes
-        local_hashes = {}
-        for entry in self.entries:
-            orig, disp, new, fh, sz, title, author = entry
-            if fh:
-                local_hashes[fh] = orig
-        
-        if not local_hashes:
-            messagebox.showinfo('Info', 'No hay archivos con hash para comprobar o lista vacía.')
-            return
+        """Compara hashes locales contra la biblioteca indexada y ofrece resolución.
+
+        Hashing and the DB lookups run on a worker thread; the resolution
+        dialog is built back on the Tk thread by `_show_dup_dialog`.
+        """
+        from .index import library_copies, sizes_in_library
+        # the worker reads this snapshot, never self.entries
+        snapshot = [(idx, e[0], e[3], e[4]) for idx, e in enumerate(self.entries)]
+        self.check_lib_dups_btn.state(['disabled'])
+        self.status.set('Comprobando duplicados en biblioteca...')
 
-        duplicates_found = [] # (local_path, remote_info_dict)
+        def worker():
+            try:
+                # only files whose size some library file shares can have a copy there;
+                # the scan only hashed local size collisions, so hash those candidates now
+                lib_sizes = sizes_in_library({sz for _, _, _, sz in snapshot if sz is not None})
+                hashed = self._hash_missing([(idx, orig) for idx, orig, fh, sz in snapshot
+                                             if not fh and sz in lib_sizes])
+                # Collect current hashes
+                local_hashes = {fh: orig for _, orig, fh, sz in snapshot if fh and sz in lib_sizes}
+                for _, orig, fh in hashed:
+                    local_hashes[fh] = orig
+
+                duplicates_found = [] # (local_path, remote_info_dict)
+                # Check against DB: one join against a temp table of the local hashes
+                matches_by_hash = library_copies(local_hashes)
+                for fh, local_path in local_hashes.items():
+                    matches = matches_by_hash.get(fh)
+                    if not matches:
+                        continue
+                    # matches includes the file itself if it was already indexed!
+                    # so checking path equality is crucial; normcase folds case only
+                    # where the filesystem does (Windows) and is a no-op elsewhere
+                    own = os.path.normcase(os.path.normpath(local_path))
+                    remotes = [m for m in matches if os.path.normcase(os.path.normpath(m['path'])) != own]
+
+                    if remotes:
+                        duplicates_found.append((local_path, remotes))
+                error = None
+            except Exception as e:
+                hashed, local_hashes, duplicates_found, error = [], {}, [], e
 
-        self.status.set('Comprobando duplicados en biblioteca...')
-        
-        # Check against DB
-        # To avoid UI freeze, could be thread, but let's do simple loop first as DB is local and fast enough for <1000 files
-        for fh, local_path in local_hashes.items():
-            matches = find_files_by_hash(fh)
-            # matches includes the file itself if it was already indexed!
-            # so checking path equality is crucial
-            remotes = []
-            for m in matches:
-                # normalize paths for comparison
-                p1 = os.path.normpath(str(m['path'])).lower()
-                p2 = os.path.normpath(str(local_path)).lower()
-                if p1 != p2:
-                    remotes.append(m)
-            
-            if remotes:
-                duplicates_found.append((local_path, remotes))
-        
-        self.status.set('')
-        
-        if not duplicates_found:
-            messagebox.showinfo('Info', 'No se encontraron duplicados externos en la biblioteca.')
-            return
+            def on_done():
+                self._store_hashes(hashed)
+                self.status.set('')
+                self.check_lib_dups_btn.state(['!disabled'])
+                if error is not None:
+                    messagebox.showerror('Error', f'No se pudo comprobar la biblioteca: {error}')
+                elif not local_hashes:
+                    messagebox.showinfo('Info', 'No hay archivos con hash para comprobar o lista vacía.')
+                elif not duplicates_found:
+                    messagebox.showinfo('Info', 'No se encontraron duplicados externos en la biblioteca.')
+                else:
+                    self._show_dup_dialog(duplicates_found)
+
+            self.root.after(0, on_done)
+
+        threading.Thread(target=worker, daemon=True).start()
 
+    def _show_dup_dialog(self, duplicates_found):
+        """Diálogo para resolver los duplicados `(local_path, remotes)` hallados en la biblioteca."""
         # Dialog to resolve
         dlg = tk.Toplevel(self.root)
         dlg.title(f'Conflicto con Biblioteca - {len(duplicates_found)} archivos')
@@ -301,68 +338,49 @@ class RenamerApp:
 
         container = ttk.Frame(dlg, style='Dialog.TFrame')
         container.pack(fill='both', expand=True)
-        
-        canvas = tk.Canvas(container, bg=self._dialog_bg, highlightthickness=0)
-        scrollbar = ttk.Scrollbar(container, orient='vertical', command=canvas.yview)
-        scroll_frame = ttk.Frame(canvas, style='Dialog.TFrame')
-        
-        scroll_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas_window = canvas.create_window((0, 0), window=scroll_frame, anchor="nw")
-        canvas.bind("<Configure>", lambda e: canvas.itemconfig(canvas_window, width=e.width))
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side='left', fill='both', expand=True)
+
+        # one Treeview row per conflict instead of a frame of labels and radio
+        # buttons each: only the visible rows cost anything to draw
+        dup_tree = ttk.Treeview(container, columns=('local', 'remote', 'action'), show='headings')
+        dup_tree.heading('local', text='LOCAL (Aquí)')
+        dup_tree.heading('remote', text='BIBLIOTECA')
+        dup_tree.heading('action', text='Acción (doble clic para cambiar)')
+        dup_tree.column('local', width=320)
+        dup_tree.column('remote', width=320)
+        dup_tree.column('action', width=240, stretch=False)
+        scrollbar = ttk.Scrollbar(container, orient='vertical', command=dup_tree.yview)
+        dup_tree.configure(yscrollcommand=scrollbar.set)
+        dup_tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
 
-        # Dictionary valid_items[local_path] = IntVar(value=0:keep_local, 1:keep_remote, 2:keep_both)
-        # But wait, user wants to CHOOSE which one to keep
-        # If I keep local => Delete remote?
-        # If I keep remote => Delete local?
-        
-        # Let's group by conflict
-        
-        actions = {} # local_path -> StringVar(value='keep_local'/'keep_remote'/'keep_both')
-        
+        # Default is keep_remote because user prefers library version
+        labels = dict(_LIB_DUP_ACTIONS)
+        codes = [code for code, _ in _LIB_DUP_ACTIONS]
+        actions = {} # iid -> (local_path, remotes, action code)
         for idx, (local_p, remotes) in enumerate(duplicates_found):
-            lf = ttk.LabelFrame(scroll_frame, text=f'Conflicto {idx+1}: {os.path.basename(local_p)}', style='Dialog.TLabelframe')
-            lf.pack(fill='x', padx=10, pady=5, anchor='n')
-            
-            # Show info
-            info_frame = ttk.Frame(lf, style='Dialog.TFrame')
-            info_frame.pack(fill='x', padx=5, pady=2)
-            
-            # Local info
-            l_lbl = ttk.Label(info_frame, text=f"LOCAL (Aquí): {local_p}", style='Dialog.TLabel', foreground=self._dialog_local)
-            l_lbl.pack(anchor='w')
-            
-            # Remote info (could be multiple, just show first few)
-            for r in remotes:
-                r_path = r['path']
-                r_lbl = ttk.Label(info_frame, text=f"BIBLIOTECA: {r_path}", style='Dialog.TLabel', foreground=self._dialog_remote)
-                r_lbl.pack(anchor='w')
-
-            # Actions
-            # Default is keep_remote because user prefers library version
-            act_var = tk.StringVar(value='keep_remote')
-            actions[local_p] = (act_var, remotes)
-            
-            act_frame = ttk.Frame(lf, style='Dialog.TFrame')
-            act_frame.pack(fill='x', padx=5, pady=2)
-            
-            ttk.Radiobutton(act_frame, text='Conservar ambos (No hacer nada)', variable=act_var, value='keep_both', style='Dialog.TRadiobutton').pack(side='left', padx=5)
-            ttk.Radiobutton(act_frame, text='Conservar LOCAL (Borrar de biblioteca)', variable=act_var, value='keep_local', style='Dialog.TRadiobutton').pack(side='left', padx=5)
-            ttk.Radiobutton(act_frame, text='Conservar BIBLIOTECA (Borrar local)', variable=act_var, value='keep_remote', style='Dialog.TRadiobutton').pack(side='left', padx=5)
+            iid = str(idx)
+            dup_tree.insert('', 'end', iid=iid, values=(local_p, '; '.join(r['path'] for r in remotes), labels['keep_remote']))
+            actions[iid] = [local_p, remotes, 'keep_remote']
+
+        def cycle_action(event):
+            row = dup_tree.identify_row(event.y)
+            if not row or dup_tree.identify_column(event.x) != '#3':
+                return
+            entry = actions[row]
+            entry[2] = codes[(codes.index(entry[2]) + 1) % len(codes)]
+            dup_tree.set(row, 'action', labels[entry[2]])
+
+        dup_tree.bind('<Double-1>', cycle_action)
 
         btn_frame = ttk.Frame(dlg, style='Dialog.TFrame')
         btn_frame.pack(fill='x', pady=10)
-        
+
         def apply():
             deleted_local = 0
             deleted_remote = 0
             errors = []
             
-            for local_p, (var, remote_list) in actions.items():
-                choice = var.get()
+            for local_p, remote_list, choice in actions.values():
                 if choice == 'keep_both':
                     continue
                 elif choice == 'keep_remote':
@@ -400,7 +418,32 @@ class RenamerApp:
         ttk.Button(btn_frame, text='Cancelar', command=dlg.destroy, style='Rounded.TButton').pack(side='right', padx=10)
         ttk.Button(btn_frame, text='Aplicar acciones', command=apply, style='Rounded.TButton').pack(side='right', padx=10)
 
-    def suggest_with_model(self, auto: bool = False, max_dist: float = 0.6):
+    @staticmethod
+    def _hash_missing(todo):
+        """Hash `(idx, path)` pairs in a thread pool; returns `(idx, path, hash)` for those read."""
+        if not todo:
+            return []
+        with ThreadPoolExecutor(max_workers=_IO_WORKERS) as ex:
+            hashes = list(ex.map(lambda item: file_hash(item[1]), todo))
+        return [(idx, path, fh) for (idx, path), fh in zip(todo, hashes) if fh]
+
+    def _store_hashes(self, hashed):
+        """Guarda en `entries` los hashes de `_hash_missing` (en el hilo de Tk).
+
+        Entries replaced since the snapshot (rescan, delete) are skipped. Entries
+        a running scan has not flushed yet are indexed by `_flush_inserts`, not here.
+        """
+        affected = set()
+        for idx, path, fh in hashed:
+            if idx < len(self.entries) and self.entries[idx][0] == path and not self.entries[idx][3]:
+                self.entries[idx][3] = fh
+                if idx < self._flushed:
+                    self._index_hash(idx, fh)
+                    affected.add(fh)
+        # the new hashes may complete duplicate groups already on screen
+        self._retag(affected)
+
+    def suggest_with_model(self, auto: bool = False):
         sels = self.tree.selection()
         target_idxs = []
         if sels:
@@ -420,44 +463,68 @@ class RenamerApp:
         self.status.set('Generando sugerencias...')
 
         def worker():
-            updated = 0
+            changed = set()
             errors = []
+            # sugerencias ya calculadas para el mismo contenido y nombre (persisten entre sesiones)
+            if self._suggest_cache is None:
+                self._suggest_cache = load_suggest_cache()
+            cache = self._suggest_cache
+            added = False
+
+            def apply(idx, suggestion):
+                best = suggestion[0]
+                if not best:
+                    return
+                newname = sanitize(best)
+                if newname != self.entries[idx][2]:
+                    self.entries[idx][2] = newname
+                    changed.add(idx)
+
+            # path -> [(idx, cache key)] for files with no cached suggestion
+            todo = {}
             for idx in target_idxs:
                 try:
-                    orig, disp, proposed, fh, sz, title, author = self.entries[idx]
-                    p = Path(orig)
-                    suggestions = suggest_for_file(p, top=3, max_dist=max_dist)
-                    if not suggestions:
-                        continue
-                    # elegir la propuesta más cercana (menor distancia) que no sea vacía
-                    best = None
-                    for dist, prop in suggestions:
-                        if prop:
-                            best = prop
-                            break
-                    if not best:
-                        continue
-                    newname = sanitize(best + p.suffix)
-                    if newname != proposed:
-                        self.entries[idx] = (orig, disp, newname, fh, sz, title, author)
-                        updated += 1
+                    orig, disp, proposed, fh, sz, title, author, size_str = self.entries[idx]
+                    # the scan only hashes size collisions; the stat key identifies the rest
+                    ident = fh
+                    if not ident:
+                        try:
+                            ident = cache_key(os.stat(orig))
+                        except OSError:
+                            ident = None
+                    key = suggest_cache_key(orig, ident) if ident else None
+                    suggestion = cache.get(key) if key else None
+                    if suggestion is None:
+                        todo.setdefault(orig, []).append((idx, key))
+                    else:
+                        apply(idx, suggestion)
                 except Exception as e:
                     errors.append(str(e))
+            # metadata parsing is GIL-bound: same process pool as the scan
+            jobs = [(orig, None, False) for orig in todo]
+            for orig, new, title, author, _ in self._process_files(jobs):
+                suggestion = [new, title, author]
+                for idx, key in todo.pop(orig):
+                    if key:
+                        cache[key] = suggestion
+                        added = True
+                    try:
+                        apply(idx, suggestion)
+                    except Exception as e:
+                        errors.append(str(e))
+            # _process_files skips the files that raised
+            errors.extend(f'{orig}: sin sugerencia' for orig in todo)
+            if added:
+                save_suggest_cache(cache)
 
             def on_done():
-                # refrescar visibles
-                for iid, i in list(self.item_map.items()):
-                    if i < len(self.entries):
-                        orig, disp, proposed, fh, sz, title, author = self.entries[i]
-                        try:
-                            self.tree.item(iid, values=(disp, proposed, human_readable_size(sz)))
-                        except Exception:
-                            pass
+                # refrescar sólo las filas cuya propuesta cambió
+                self._refresh_rows(changed)
                 self.model_btn.state(['!disabled'])
                 if errors and not auto:
                     messagebox.showwarning('Modelo', f'Sugerencias completadas con {len(errors)} errores (ver consola).')
                 elif not errors and not auto:
-                    messagebox.showinfo('Modelo', f'Actualizadas {updated} propuestas con el modelo')
+                    messagebox.showinfo('Modelo', f'Actualizadas {len(changed)} propuestas con el modelo')
                 self.status.set('')
 
             self.root.after(0, on_done)
@@ -495,7 +562,13 @@ class RenamerApp:
         self.tree.delete(*self.tree.get_children())
         self.entries = []
         self.item_map = {}
+        self._row_iids = []
         self._next_iid = 0
+        self._hash_iids = {}
+        self._dup_index = {}
+        self._shown = 0
+        self._flushed = 0
+        self._show_limit = _MATERIALIZE_CHUNK
         self.status.set('Escaneando...')
         # Fast path: if an index DB exists and contains entries for this folder,
         # load from the DB instead of scanning the filesystem (much faster),
@@ -503,79 +576,33 @@ class RenamerApp:
         try:
             folder_path = Path(folder).resolve()
             if db_exists():
-                sha_map = {}
-                rows = list(files_in_folder(folder_path))
+                rows = files_in_folder(folder_path)
                 if rows:
                     # Filter out DB entries whose files no longer exist on disk.
                     missing = []
                     filtered_rows = []
                     for r in rows:
-                        p = Path(r['path'])
-                        if not p.exists():
-                            missing.append(r['path'])
+                        if not os.path.exists(r[0]):
+                            missing.append(r[0])
                             continue
                         filtered_rows.append(r)
-                    # If any missing entries, remove them from the DB to avoid stale results
-                    if missing:
-                        try:
-                            conn = sqlite3.connect(str(DB_PATH))
-                            cur = conn.cursor()
-                            for mp in missing:
-                                try:
-                                    cur.execute('DELETE FROM files WHERE path=?', (mp,))
-                                except Exception:
-                                    pass
-                            conn.commit()
-                            conn.close()
-                        except Exception:
-                            pass
+                    # the missing entries are removed from the DB by the incremental pass,
+                    # once it has matched them against renamed/moved files
                     rows = filtered_rows
-                    for r in rows:
-                        p = Path(r['path'])
-                        title = r.get('title')
-                        author = r.get('authors')
-                        ext = p.suffix
+                    # plain strings and tuple unpacking: no Path or dict per row
+                    for path, sz, fh, title, author in rows:
+                        name = os.path.basename(path)
+                        ext = os.path.splitext(name)[1]
                         t = sanitize(str(title)) if title else ''
                         a = format_authors_for_filename(normalize_authors(author), max_authors=3) if author else ''
-                        if a and t:
-                            new = f"{a} - {t}{ext}"
-                        elif t:
-                            new = f"{t}{ext}"
-                        elif a:
-                            new = f"{a}{ext}"
-                        else:
-                            new = p.name
-                        fh = r.get('sha256')
-                        sz = r.get('size')
-                        idx = len(self.entries)
-                        self.entries.append((str(p), p.name, new, fh, sz, title, author))
-                        iid = f'i{self._next_iid}'
-                        self._next_iid += 1
-                        tags = ()
-                        try:
-                            self.tree.insert('', 'end', iid=iid, values=(p.name, new, human_readable_size(sz)), tags=tags)
-                        except Exception:
-                            self.tree.insert('', 'end', values=(p.name, new, human_readable_size(sz)))
-                        self.item_map[iid] = idx
-                        if fh:
-                            sha_map.setdefault(fh, []).append(iid)
-                    # mark duplicates (same sha256) with tag 'dup'
-                    for h, iids in sha_map.items():
-                        if len(iids) > 1:
-                            for ii in iids:
-                                try:
-                                    existing = set(self.tree.item(ii, 'tags') or ())
-                                    existing.add('dup')
-                                    self.tree.item(ii, tags=tuple(existing))
-                                except Exception:
-                                    pass
+                        # sanitized once here, so renaming can use it as is
+                        new = sanitize(format_proposal(a, t, ext, name))
+                        self.entries.append([path, name, new, fh, sz, title, author, human_readable_size(sz)])
+                    # rows sharing a sha256 are tagged 'dup' as they are created
+                    self._flush_inserts(range(len(self.entries)))
                     self.status.set('Escaneo desde índice completado')
                     self.scan_btn.state(['!disabled'])
                     self.rename_btn.state(['!disabled'])
-                    try:
-                        self.tree.tag_configure('dup', background='#ffdce0')
-                    except Exception:
-                        pass
 
                     # sugerir con modelo automáticamente si está habilitado
                     self._maybe_auto_model()
@@ -583,78 +610,121 @@ class RenamerApp:
                     # start incremental background worker to detect new/changed files
                     def incremental_worker(folder_path):
                         try:
-                            conn = sqlite3.connect(str(DB_PATH))
-                            cur = conn.cursor()
-                            local_sha_map = {}
-                            seen_paths = set()
-                            # build quick map of existing DB entries for folder
-                            cur.execute('SELECT path,size,mtime,sha256,title,authors FROM files WHERE path LIKE ?', (str(folder_path) + '%',))
-                            db_map = {row[0]: {'size': row[1], 'mtime': row[2], 'sha': row[3], 'title': row[4], 'authors': row[5]} for row in cur.fetchall()}
-                            for p in folder_path.rglob('*'):
-                                if not p.is_file():
-                                    continue
-                                sp = str(p)
+                            # the GUI's shared write connection, used under write_lock
+                            conn = shared_writer()
+                            # the walk is compared with the index one IN (...) chunk at a time,
+                            # so only rows for files actually found are ever loaded
+                            changed = []
+                            walked = []
+
+                            def check_walked():
+                                with write_lock:
+                                    db_map = {row[0]: row[1:] for row in stats_for_paths(conn.cursor(), [item[0] for item in walked])}
+                                for sp, st in walked:
+                                    db_row = db_map.get(sp)
+                                    # unchanged (a digest from another algorithm is redone)
+                                    if db_row and db_row[0] == st.st_size and abs((db_row[1] or 0) - st.st_mtime) < 1.0 \
+                                            and db_row[2] == HASH_ALGO:
+                                        continue
+                                    changed.append((Path(sp), sp, st.st_size, st.st_mtime, st))
+                                walked.clear()
+
+                            # scandir walk: file types come from the listing, one stat per file
+                            for entry in iter_files(folder_path):
                                 try:
-                                    st = p.stat()
-                                except Exception:
+                                    st = entry.stat()
+                                except OSError:
                                     continue
-                                size = st.st_size
-                                mtime = st.st_mtime
-                                db_row = db_map.get(sp)
-                                if db_row and db_row.get('size') == size and abs((db_row.get('mtime') or 0) - mtime) < 1.0:
-                                    # unchanged
-                                    seen_paths.add(sp)
-                                    continue
-                                # new or changed: compute sha, extract metadata and upsert
-                                fh = None
-                                try:
-                                    with open(p, 'rb') as fhf:
-                                        import hashlib as _hash
-                                        h = _hash.sha256()
-                                        for chunk in iter(lambda: fhf.read(65536), b''):
-                                            h.update(chunk)
-                                        fh = h.hexdigest()
-                                except Exception:
-                                    fh = None
-                                title = None
-                                authors = None
-                                new_pro = None
-                                try:
-                                    new_pro, title, authors = suggest_for_file(p)
-                                except Exception:
-                                    pass
-                                # upsert into DB
-                                indexed_at = datetime.utcnow().isoformat()
-                                try:
-                                    cur.execute('INSERT OR REPLACE INTO files(path,relpath,size,mtime,sha256,title,authors,indexed_at) VALUES(?,?,?,?,?,?,?,?)',
-                                                (sp, str(p.relative_to(folder_path)), size, mtime, fh, title, str(authors) if authors else None, indexed_at))
-                                    conn.commit()
-                                except Exception:
-                                    pass
-                                # update tree: append new entry and mark duplicates later
-                                def add_row_to_tree():
-                                    idx = len(self.entries)
-                                    p_name = p.name
-                                    new = new_pro if new_pro else p_name
-                                    self.entries.append((sp, p_name, new, fh, size, title, authors))
-                                    iid = f'i{self._next_iid}'
-                                    self._next_iid += 1
-                                    self.tree.insert('', 'end', iid=iid, values=(p_name, new, human_readable_size(size)))
-                                    self.item_map[iid] = idx
-                                    if fh:
-                                        local_sha_map.setdefault(fh, []).append(iid)
-                                self.root.after(0, add_row_to_tree)
-                            # after scanning, mark duplicates found in incremental pass
-                            for h, iids in local_sha_map.items():
-                                if len(iids) > 1:
-                                    for ii in iids:
+                                walked.append((entry.path, st))
+                                if len(walked) >= _LOOKUP_CHUNK:
+                                    check_walked()
+                            if walked:
+                                check_walked()
+
+                            # new or changed: compute sha and extract metadata in parallel
+                            # (see _process_files); the DB is written from this thread only.
+                            # A digest in the hash cache for the same (inode, mtime, size)
+                            # is reused instead of reading the file.
+                            hash_cache = load_hash_cache()
+                            cache_hits = {}
+                            for item in changed:
+                                cached = hash_cache.get(cache_key(item[4]))
+                                if cached:
+                                    cache_hits[item[1]] = cached
+                            self._reuse_moved_digests(conn, [item for item in changed if item[1] not in cache_hits], cache_hits)
+
+                            # path -> index, for the entries list it was built from
+                            known = {}
+                            known_for = [None]
+
+                            def add_rows(rows):
+                                # files the DB listing already showed are updated, not added twice;
+                                # scan() and deletes replace self.entries, so rebuild the map then
+                                if known_for[0] is not self.entries:
+                                    known.clear()
+                                    known.update((e[0], i) for i, e in enumerate(self.entries))
+                                    known_for[0] = self.entries
+                                start = len(self.entries)
+                                updates = []
+                                for sp, p_name, new, fh, size, title, authors in rows:
+                                    idx = known.get(sp)
+                                    if idx is not None and self.entries[idx][0] == sp:
+                                        updates.append((idx, new, fh, size, title, authors))
+                                        continue
+                                    known[sp] = len(self.entries)
+                                    self.entries.append([sp, p_name, new, fh, size, title, authors, human_readable_size(size)])
+                                self._update_entries(updates)
+                                # same batched insert (and dup tagging) as the full scan
+                                self._flush_inserts(range(start, len(self.entries)))
+
+                            def write_upserts():
+                                # one executemany and one commit (one fsync) per batch
+                                with write_lock:
+                                    try:
+                                        conn.executemany(_UPSERT_SQL, upserts)
+                                        conn.commit()
+                                    except Exception:
+                                        conn.rollback()
+                                upserts.clear()
+
+                            upserts = []
+                            pending = []
+                            last_flush = time.monotonic()
+                            # metadata goes through the scan's process pool (GIL-bound parsing);
+                            # results come back in any order
+                            by_path = {item[1]: item for item in changed}
+                            jobs = [(sp, cache_hits.get(sp), True) for sp in by_path]
+                            # rows processed before an error still reach the index
+                            try:
+                                for sp, new_pro, title, authors, fh in self._process_files(jobs):
+                                    p, sp, size, mtime, st = by_path[sp]
+                                    if fh and sp not in cache_hits:
+                                        hash_cache[cache_key(st)] = fh
+                                    # upsert into DB
+                                    indexed_at = datetime.utcnow().isoformat()
+                                    upserts.append((sp, str(p.relative_to(folder_path)), size, mtime, fh, HASH_ALGO, title, str(authors) if authors else None, indexed_at))
+                                    if len(upserts) >= _UPSERT_BATCH:
+                                        write_upserts()
+                                    pending.append((sp, p.name, new_pro if new_pro else sanitize(p.name), fh, size, title, authors))
+                                    if len(pending) >= _BATCH_ROWS or time.monotonic() - last_flush >= _BATCH_SECONDS:
+                                        self.root.after(0, add_rows, pending)
+                                        pending = []
+                                        last_flush = time.monotonic()
+                            finally:
+                                if upserts:
+                                    write_upserts()
+                                # stale rows for files no longer on disk
+                                if missing:
+                                    with write_lock:
                                         try:
-                                            existing = set(self.tree.item(ii, 'tags') or ())
-                                            existing.add('dup')
-                                            self.tree.item(ii, tags=tuple(existing))
+                                            conn.executemany('DELETE FROM files WHERE path=?', [(mp,) for mp in missing])
+                                            conn.commit()
                                         except Exception:
-                                            pass
-                            conn.close()
+                                            conn.rollback()
+                            if len(cache_hits) < len(changed):
+                                save_hash_cache(hash_cache)
+                            if pending:
+                                self.root.after(0, add_rows, pending)
                             # final UI update
                             def on_done_inc():
                                 self.status.set('Escaneo incremental completado')
@@ -668,67 +738,72 @@ class RenamerApp:
         except Exception:
             pass
 
-        def file_hash(path, block_size=65536):
-            h = hashlib.sha256()
-            try:
-                with open(path, 'rb') as fh:
-                    for chunk in iter(lambda: fh.read(block_size), b''):
-                        h.update(chunk)
-                return h.hexdigest()
-            except Exception:
-                return None
-
         def worker(folder_path):
-            p = Path(folder_path)
-            hash_map = {}
-            for f in p.iterdir():
-                if f.is_file():
-                    new, title, author = suggest_for_file(f)
-
-                    file_h = file_hash(str(f))
-                    size_val = None
+            old_cache = load_hash_cache()
+            new_cache = {}
+            pending = []
+            last_flush = time.monotonic()
+            files = []
+            # scandir hands back DirEntry objects whose type (and, on Windows, stat)
+            # come from the directory listing itself
+            with os.scandir(folder_path) as it:
+                for entry in it:
+                    try:
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
                     try:
-                        size_val = f.stat().st_size
+                        st = entry.stat()
                     except Exception:
-                        size_val = None
-                    # store: full path, display name, proposed new name, hash, size, title, author
-                    self.entries.append((str(f), f.name, new, file_h, size_val, title, author))
-
-                    def insert_item(fname=f.name, nname=new, fh=file_h, sz=size_val):
-                        # create IID first
-                        idx = len(self.entries) - 1
-                        iid = f'i{self._next_iid}'
-                        self._next_iid += 1
-                        tags = ()
-                        # If we have a file hash, check if we've seen it before
-                        if fh:
-                            prev_iid = hash_map.get(fh)
-                            if prev_iid:
-                                # mark previous item as duplicate
-                                try:
-                                    prev_tags = set(self.tree.item(prev_iid, 'tags') or ())
-                                    prev_tags.add('dup')
-                                    self.tree.item(prev_iid, tags=tuple(prev_tags))
-                                except Exception:
-                                    pass
-                                tags = ('dup',)
-                            else:
-                                # first time we see this hash: record this iid
-                                hash_map[fh] = iid
-
-                        self.tree.insert('', 'end', iid=iid, values=(fname, nname, human_readable_size(sz)), tags=tags)
-                        self.item_map[iid] = idx
-
-                    self.root.after(0, insert_item)
+                        st = None
+                    files.append((entry.path, st))
+            # a file with a unique size cannot have a duplicate: only size collisions
+            # are hashed, and only when their first block matches as well
+            by_size = {}
+            for f, st in files:
+                if st is not None:
+                    by_size.setdefault(st.st_size, []).append((f, st))
+            with ThreadPoolExecutor(max_workers=_IO_WORKERS) as ex:
+                collide = [(f, st) for group in by_size.values() if len(group) > 1 for f, st in group]
+                by_head = {}
+                for (f, st), head in zip(collide, ex.map(lambda item: head_hash(item[0]), collide)):
+                    if head:
+                        by_head.setdefault((st.st_size, head), []).append(f)
+            need_hash = {f for group in by_head.values() if len(group) > 1 for f in group}
+
+            stats = {}
+            jobs = []
+            for path_str, st in files:
+                stats[path_str] = st
+                cached_h = old_cache.get(cache_key(st)) if st is not None else None
+                jobs.append((path_str, cached_h, path_str in need_hash))
+            for path_str, new, title, author, file_h in self._process_files(jobs):
+                st = stats[path_str]
+                size_val = st.st_size if st is not None else None
+                if st is not None and file_h:
+                    new_cache[cache_key(st)] = file_h
+                name = os.path.basename(path_str)
+                # store: full path, display name, proposed new name, hash, size, title, author,
+                # and the size already formatted for the tree (formatted once, off the Tk thread)
+                idx = len(self.entries)
+                self.entries.append([path_str, name, new, file_h, size_val, title, author, human_readable_size(size_val)])
+                pending.append(idx)
+                # hand rows to the Tk thread in batches instead of one callback per file
+                if len(pending) >= _BATCH_ROWS or time.monotonic() - last_flush >= _BATCH_SECONDS:
+                    self.root.after(0, self._flush_inserts, pending)
+                    pending = []
+                    last_flush = time.monotonic()
+            if pending:
+                self.root.after(0, self._flush_inserts, pending)
+
+            # only keep entries seen in this walk so the cache does not grow unbounded
+            save_hash_cache(new_cache)
 
             def on_done():
                 self.status.set('Escaneo completado')
                 self.scan_btn.state(['!disabled'])
                 self.rename_btn.state(['!disabled'])
-                try:
-                    self.tree.tag_configure('dup', background='#ffdce0')
-                except Exception:
-                    pass
                 # sugerir con modelo automáticamente si está habilitado
                 self._maybe_auto_model()
 
@@ -738,7 +813,313 @@ class RenamerApp:
         self._scan_thread = t
         t.start()
 
+    @staticmethod
+    def _reuse_moved_digests(conn, items, found):
+        """Take digests of renamed/moved files from the index into `found` ({path: digest}).
+
+        `items` are (Path, path, size, mtime, stat) of files not in the index under
+        their current path. A file matches when exactly one indexed row has the
+        same size and mtime and that row's path is gone from disk; if several
+        do, the file is hashed as usual.
+        """
+        if not items:
+            return
+        with write_lock:
+            rows = list(digests_for_sizes(conn.cursor(), {item[2] for item in items}))
+        by_stamp = {}
+        for path, size, mtime, sha in rows:
+            by_stamp.setdefault((size, mtime), []).append((path, sha))
+        for item in items:
+            gone = [sha for path, sha in by_stamp.get((item[2], item[3]), ()) if not os.path.exists(path)]
+            if len(gone) == 1:
+                found[item[1]] = gone[0]
+
+    @staticmethod
+    def _process_files(jobs):
+        """Genera `process_file(*job)` para cada job, en cualquier orden.
+
+        Large folders go to a process pool, since metadata parsing (PyPDF2,
+        regexes) is GIL-bound; small ones, or a pool that fails to start or
+        loses a worker, are handled by threads.
+        """
+        done = set()
+        if len(jobs) >= PROCESS_POOL_MIN_FILES:
+            try:
+                import multiprocessing
+                # spawn: forking a process that runs Tk threads is unsafe
+                ctx = multiprocessing.get_context('spawn')
+                # workers hash with this process's algorithm: their digests are stored
+                # under its HASH_ALGO label
+                with ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=ctx,
+                                         initializer=use_hash_algo, initargs=(HASH_ALGO,)) as ex:
+                    for res in ex.map(process_file, *zip(*jobs), chunksize=8):
+                        done.add(res[0])
+                        yield res
+                return
+            except Exception:
+                jobs = [job for job in jobs if job[0] not in done]
+        with ThreadPoolExecutor(max_workers=_THREAD_WORKERS) as ex:
+            futures = [ex.submit(process_file, *job) for job in jobs]
+            for fut in as_completed(futures):
+                try:
+                    yield fut.result()
+                except Exception:
+                    continue
+
+    def _flush_inserts(self, idxs):
+        """Da al árbol las entradas `idxs` (ya añadidas a `entries`, en orden).
+
+        Runs on the Tk thread. Every entry is indexed by hash right away so
+        duplicates are known for the whole folder; tree items are only created
+        up to `_show_limit` (see `_materialize`).
+        """
+        newly_dup = []
+        for idx in idxs:
+            fh = self.entries[idx][3]
+            self._index_hash(idx, fh)
+            # a second copy appeared: the first one may already be on screen untagged
+            if fh and len(self._dup_index[fh]) == 2:
+                newly_dup.append(fh)
+            self._flushed = idx + 1
+        # tag those anchors once per batch, after the hash index is complete
+        self._tag_dup(self._hash_iids.get(fh) for fh in newly_dup)
+        self._materialize()
+
+    def _update_entries(self, updates):
+        """Aplica datos recién indexados a entradas ya listadas (hilo de Tk).
+
+        `updates` holds (idx, new, hash, size, title, authors). The hash index,
+        the 'dup' tags of created rows whose group changed and their values
+        are brought up to date.
+        """
+        if not updates:
+            return
+        affected = set()
+        for idx, new, fh, size, title, authors in updates:
+            entry = self.entries[idx]
+            old = entry[3]
+            entry[2:8] = [new, fh, size, title, authors, human_readable_size(size)]
+            if old == fh:
+                continue
+            if old:
+                group = self._dup_index.get(old)
+                if group and idx in group:
+                    group.remove(idx)
+                affected.add(old)
+            self._index_hash(idx, fh)
+            if fh:
+                affected.add(fh)
+        changed = {u[0] for u in updates}
+        self._retag(affected, changed)
+        self._refresh_rows(changed)
+
+    def _retag(self, affected, idxs=()):
+        """Recalcula la etiqueta 'dup' de las filas creadas cuyo hash está en `affected` (o índice en `idxs`).
+
+        The tagging anchors (`_hash_iids`) of the `affected` hashes are picked again.
+        """
+        rows = set(idxs)
+        for h in affected:
+            self._hash_iids.pop(h, None)
+            rows.update(self._dup_index.get(h, ()))
+        # only rows with a tree item, in creation order (the first is the anchor)
+        tags = []
+        for i in sorted(i for i in rows if i < self._shown):
+            iid = self._row_iids[i]
+            fh = self.entries[i][3]
+            if fh in affected:
+                self._hash_iids.setdefault(fh, iid)
+            dup = fh and len(self._dup_index.get(fh, ())) > 1
+            tags.append((iid, _DUP_TAGS if dup else ()))
+        # _row_iids only holds live items: one guard for the whole batch
+        try:
+            for iid, t in tags:
+                self.tree.item(iid, tags=t)
+        except Exception:
+            pass
+
+    def _drop_entries(self, removed):
+        """Quita de `entries` y del árbol las entradas `removed` ({idx: iid}).
+
+        Only the removed rows are deleted from the tree; surviving items keep
+        their iids and just get their entries index remapped.
+        """
+        self.tree.delete(*removed.values())
+        affected = {self.entries[idx][3] for idx in removed} - {None}
+        remap = {}
+        kept = []
+        for idx, entry in enumerate(self.entries):
+            if idx not in removed:
+                remap[idx] = len(kept)
+                kept.append(entry)
+        # a new list (not an in-place filter) so holders of the old one can tell
+        self.entries = kept
+        self.item_map = {iid: remap[idx] for iid, idx in self.item_map.items() if idx in remap}
+        self._row_iids = [iid for idx, iid in enumerate(self._row_iids) if idx not in removed]
+        self._shown -= sum(1 for idx in removed if idx < self._shown)
+        self._flushed -= sum(1 for idx in removed if idx < self._flushed)
+        self._dup_index = {}
+        for idx in range(self._flushed):
+            self._index_hash(idx, kept[idx][3])
+        self._retag(affected)
+        self._materialize()
+
+    def _materialize(self):
+        """Crea los items del árbol para entries[_shown:min(_flushed, _show_limit)]."""
+        end = min(self._flushed, self._show_limit)
+        if self._shown >= end:
+            return
+        # unmap the tree while inserting so Tk lays it out once per batch, not per row,
+        # and cut the scrollbar callbacks, which otherwise fire on every insert
+        detach = end - self._shown >= _DETACH_MIN_ROWS
+        if detach:
+            self.tree.grid_remove()
+            self.tree.configure(yscrollcommand='', xscrollcommand='')
+        try:
+            for idx in range(self._shown, end):
+                orig, disp, new, fh, sz, title, author, size_str = self.entries[idx]
+                iid = f'i{self._next_iid}'
+                self._next_iid += 1
+                tags = ()
+                if fh:
+                    if len(self._dup_index.get(fh, ())) > 1:
+                        tags = _DUP_TAGS
+                    # first iid seen for this hash
+                    self._hash_iids.setdefault(fh, iid)
+                self.tree.insert('', 'end', iid=iid, values=(disp, new, size_str), tags=tags)
+                self.item_map[iid] = idx
+                self._row_iids.append(iid)
+                self._shown = idx + 1
+        finally:
+            if detach:
+                self.tree.configure(yscrollcommand=self._on_yscroll, xscrollcommand=self._hscroll.set)
+                # grid() without options restores the row/column/sticky given at build time
+                self.tree.grid()
+
+    def _refresh_rows(self, idxs):
+        """Repinta las filas ya creadas de los índices `idxs` (las demás leen `entries` al crearse)."""
+        rows = [(self._row_iids[i], i) for i in sorted(set(idxs)) if i < self._shown]
+        if not rows:
+            return
+        # same as _materialize: no scrollbar callbacks per row, and for big batches
+        # no columns to redraw either
+        detach = len(rows) >= _DETACH_MIN_ROWS
+        hide_columns = len(rows) > _HIDE_COLUMNS_MIN_ROWS
+        if detach:
+            self.tree.configure(yscrollcommand='', xscrollcommand='')
+            if hide_columns:
+                self.tree.configure(displaycolumns=())
+        try:
+            for iid, i in rows:
+                entry = self.entries[i]
+                self.tree.item(iid, values=(entry[1], entry[2], entry[7]))
+        except Exception:
+            pass
+        finally:
+            if detach:
+                if hide_columns:
+                    self.tree.configure(displaycolumns='#all')
+                self.tree.configure(yscrollcommand=self._on_yscroll, xscrollcommand=self._hscroll.set)
+        self.tree.update_idletasks()
+
+    def _on_wheel(self, event):
+        """Desplaza el árbol con la rueda del ratón; todo en aritmética entera."""
+        delta = event.delta
+        if delta:
+            # Windows: multiples of 120; macOS: small deltas, one unit per event
+            units = -(delta // 120) if delta % 120 == 0 else (-1 if delta > 0 else 1)
+        else:
+            # X11 sends no delta, just button 4 (up) or 5 (down)
+            num = getattr(event, 'num', 0)
+            units = -1 if num == 4 else 1 if num == 5 else 0
+        if units:
+            self.tree.yview_scroll(units, 'units')
+
+    def _on_yscroll(self, first, last):
+        self._vscroll.set(first, last)
+        # the view reached the last tenth of the created rows: create the next chunk
+        if float(last) >= 0.9 and self._shown < self._flushed and self._show_limit <= self._shown:
+            self._show_limit = self._shown + _MATERIALIZE_CHUNK
+            self.root.after_idle(self._materialize)
+
+    def _tag_dup(self, iids):
+        """Marca como 'dup' los items `iids` (None = sin item todavía)."""
+        try:
+            for iid in iids:
+                if iid is not None:
+                    self.tree.item(iid, tags=_DUP_TAGS)
+        except Exception:
+            pass
+
+    def _index_hash(self, idx, fh):
+        if fh:
+            self._dup_index.setdefault(fh, []).append(idx)
+
+    @staticmethod
+    def _existing_names(folder):
+        """Nombres (normcase) presentes en `folder`, leídos con un único scandir."""
+        try:
+            with os.scandir(folder) as it:
+                return {os.path.normcase(e.name) for e in it}
+        except OSError:
+            return set()
+
+    @staticmethod
+    def _free_name(name, existing):
+        """Devuelve `name` o `name (N)` de modo que no choque con `existing`."""
+        if os.path.normcase(name) not in existing:
+            return name
+        base, suffix = os.path.splitext(name)
+        i = 1
+        while os.path.normcase(f"{base} ({i}){suffix}") in existing:
+            i += 1
+        return f"{base} ({i}){suffix}"
+
+    @staticmethod
+    def _folder_key(folder):
+        """Forma normalizada de `folder`, calculada una vez por renombrado."""
+        return os.path.normcase(os.path.abspath(folder))
+
+    def _in_folder(self, path, folder_key):
+        return self._folder_key(path.parent) == folder_key
+
+    def _claim_name(self, folder_key, src, name, existing):
+        """Elige un nombre libre para `src` dentro de la carpeta y lo reserva en `existing`.
+
+        `folder_key` comes from `_folder_key`. The file's own current name does
+        not count as a collision.
+        """
+        own = os.path.normcase(src.name) if self._in_folder(src, folder_key) else None
+        if own:
+            existing.discard(own)
+        free = self._free_name(name, existing)
+        existing.add(os.path.normcase(free))
+        if own:
+            existing.add(own)
+        return free
+
+    def _release_name(self, folder_key, src, dst, existing):
+        # after a successful move the old name is free again
+        if self._in_folder(src, folder_key) and os.path.normcase(src.name) != os.path.normcase(dst.name):
+            existing.discard(os.path.normcase(src.name))
+
+    def _renamed(self, idx, iid, dst):
+        """Refleja en `entries` y en el árbol un archivo ya movido a `dst`.
+
+        Content, hash and size are unchanged by a move, so no rescan is needed;
+        'Escanear' still reloads the folder from disk.
+        """
+        entry = self.entries[idx]
+        entry[0], entry[1], entry[2] = str(dst), dst.name, dst.name
+        size_str = entry[7]
+        if iid is not None:
+            try:
+                self.tree.item(iid, values=(dst.name, dst.name, size_str))
+            except Exception:
+                pass
+
     def rename_files(self):
+        import shutil
         if not self.entries:
             messagebox.showinfo('Nada', 'No hay archivos para renombrar. Escanee primero.')
             return
@@ -748,29 +1129,26 @@ class RenamerApp:
             return
         self.rename_btn.state(['disabled'])
         conflicts = []
-        for orig, disp, new, fh, sz, title, author in list(self.entries):
+        # one listing of the folder and one normalized folder path for the whole loop;
+        # proposals are stored already sanitized
+        existing = self._existing_names(folder)
+        folder_key = self._folder_key(folder)
+        folder_path = Path(folder)
+        for idx, (orig, disp, new, fh, sz, title, author, size_str) in enumerate(list(self.entries)):
             src = Path(orig)
-            safe_new = sanitize(new)
-            dst = Path(folder) / safe_new
-            if dst.exists():
-                base = dst.stem
-                idx = 1
-                while True:
-                    candidate = Path(folder) / f"{base} ({idx}){dst.suffix}"
-                    if not candidate.exists():
-                        dst = candidate
-                        break
-                    idx += 1
+            dst = folder_path / self._claim_name(folder_key, src, new, existing)
             try:
                 shutil.move(str(src), str(dst))
             except Exception as e:
                 conflicts.append((src, e))
+                continue
+            self._release_name(folder_key, src, dst, existing)
+            self._renamed(idx, self._row_iids[idx] if idx < self._shown else None, dst)
         if conflicts:
             messagebox.showerror('Errores', f'Ocurrieron errores con {len(conflicts)} archivos')
         else:
             messagebox.showinfo('Listo', 'Renombrado completado')
         self.rename_btn.state(['!disabled'])
-        self.scan()
 
     def convert_selected_to_epub(self):
         sels = self.tree.selection()
@@ -783,13 +1161,15 @@ class RenamerApp:
         self.status.set('Convirtiendo...')
 
         def worker(selected_iids):
+            # ebooklib/PIL/PyPDF2 only load the first time something is converted
+            from .convert import convert_to_epub
             errors = []
             converted = 0
             for iid in selected_iids:
                 idx = self.item_map.get(iid)
                 if idx is None or idx >= len(self.entries):
                     continue
-                orig, disp, proposed, fh, sz, title, author = self.entries[idx]
+                orig, disp, proposed, fh, sz, title, author, size_str = self.entries[idx]
                 p = Path(orig)
                 # sanitize the output epub name (remove control chars from original stem)
                 dst = p.with_name(sanitize(p.stem) + '.epub')
@@ -833,38 +1213,27 @@ class RenamerApp:
             return
         if not messagebox.askyesno('Confirmar eliminación', f'¿Eliminar {len(sels)} archivo(s)? Esta acción no se puede deshacer.'):
             return
-        removed_paths = []
+        removed = {}  # entries index -> iid
         errors = []
         for iid in list(sels):
             idx = self.item_map.get(iid)
             if idx is None or idx >= len(self.entries):
                 continue
-            orig, disp, proposed, fh, sz, title, author = self.entries[idx]
+            orig, disp, proposed, fh, sz, title, author, size_str = self.entries[idx]
             try:
                 if os.path.exists(orig):
                     os.remove(orig)
-                removed_paths.append(orig)
+                removed[idx] = iid
             except Exception as e:
                 errors.append((orig, str(e)))
 
-        # remove deleted entries from internal list and rebuild tree
-        if removed_paths:
-            self.entries = [e for e in self.entries if e[0] not in removed_paths]
-            self.tree.delete(*self.tree.get_children())
-            self.item_map = {}
-            # simple rebuild, without preserving duplicate tags
-            # rebuild using the global iid counter to avoid collisions
-            for idx, entry in enumerate(self.entries):
-                orig, disp, proposed, fh, sz, title, author = entry
-                iid = f'i{self._next_iid}'
-                self._next_iid += 1
-                self.tree.insert('', 'end', iid=iid, values=(disp, proposed, human_readable_size(sz)))
-                self.item_map[iid] = idx
+        if removed:
+            self._drop_entries(removed)
 
         if errors:
             messagebox.showerror('Errores', f'Ocurrieron errores al eliminar {len(errors)} archivos')
         else:
-            messagebox.showinfo('Listo', f'Eliminados {len(removed_paths)} archivos')
+            messagebox.showinfo('Listo', f'Eliminados {len(removed)} archivos')
 
     def refine_selected_proposals(self):
         from .utils import guess_title_author_from_filename
@@ -878,9 +1247,9 @@ class RenamerApp:
         else:
             target_idxs = list(range(len(self.entries)))
 
-        changed = 0
+        changed = set()
         for idx in target_idxs:
-            orig, disp, proposed, fh, sz, title, author = self.entries[idx]
+            orig, disp, proposed, fh, sz, title, author, size_str = self.entries[idx]
             # try metadata first
             tmeta, ameta = title, author
             # if no useful metadata, try to guess from filename or display name
@@ -895,32 +1264,18 @@ class RenamerApp:
             # format proposal
             a = format_authors_for_filename(normalize_authors(final_author), max_authors=3) if final_author else ''
             t = sanitize(final_title) if final_title else ''
-            ext = Path(orig).suffix
-            if a and t:
-                newname = f"{a} - {t}{ext}"
-            elif t:
-                newname = f"{t}{ext}"
-            elif a:
-                newname = f"{a}{ext}"
-            else:
-                newname = disp or os.path.basename(orig)
+            ext = os.path.splitext(orig)[1]
+            newname = format_proposal(a, t, ext, disp or os.path.basename(orig))
 
             # sanitize the final filename proposal to avoid invalid chars
             newname = sanitize(newname)
             if newname != proposed:
-                self.entries[idx] = (orig, disp, newname, fh, sz, final_title, final_author)
-                changed += 1
-
-        if changed:
-            # refresh tree values for visible items
-            for iid, idx in list(self.item_map.items()):
-                if idx < len(self.entries):
-                    orig, disp, proposed, fh, sz, title, author = self.entries[idx]
-                    try:
-                        self.tree.item(iid, values=(disp, proposed, human_readable_size(sz)))
-                    except Exception:
-                        pass
-        messagebox.showinfo('Refinar', f'Actualizadas {changed} propuestas')
+                self.entries[idx][2:7] = [newname, fh, sz, final_title, final_author]
+                changed.add(idx)
+
+        # refresh tree values for the rows that changed
+        self._refresh_rows(changed)
+        messagebox.showinfo('Refinar', f'Actualizadas {len(changed)} propuestas')
 
     def on_select(self):
         return
@@ -956,22 +1311,21 @@ class RenamerApp:
             newval = edit.get().strip()
             edit.destroy()
             self._editing_entry = None
+            if col_index == 1:
+                # proposals are kept sanitized (rename uses them as is)
+                newval = sanitize(newval)
             vals[col_index] = newval
             self.tree.item(row, values=vals)
             idx = self.item_map.get(row)
             if idx is not None and idx < len(self.entries):
-                # entries structure: (full_path, display_name, proposed_new, hash, size, title, author)
-                orig, disp, proposed, fh, sz, title, author = self.entries[idx]
-                if col_index == 0:
-                    disp = newval
-                else:
-                    proposed = newval
-                self.entries[idx] = (orig, disp, proposed, fh, sz, title, author)
+                # entries structure: [full_path, display_name, proposed_new, hash, size, title, author, size_str]
+                self.entries[idx][1 if col_index == 0 else 2] = newval
 
         edit.bind('<Return>', finish)
         edit.bind('<FocusOut>', finish)
 
     def rename_selected(self):
+        import shutil
         sels = self.tree.selection()
         if not sels:
             messagebox.showinfo('Seleccionar', 'Seleccione una o más filas para renombrar')
@@ -981,39 +1335,32 @@ class RenamerApp:
             messagebox.showwarning('Carpeta', 'Seleccione una carpeta primero')
             return
         conflicts = []
+        existing = self._existing_names(folder)
+        folder_key = self._folder_key(folder)
+        folder_path = Path(folder)
         for iid in sels:
             idx = self.item_map.get(iid)
             if idx is None or idx >= len(self.entries):
                 continue
-            orig, disp, new, fh, sz, title, author = self.entries[idx]
+            orig, disp, new, fh, sz, title, author, size_str = self.entries[idx]
             src = Path(orig)
-            dst = Path(folder) / new
-            if dst.exists():
-                base = dst.stem
-                i = 1
-                while True:
-                    candidate = Path(folder) / f"{base} ({i}){dst.suffix}"
-                    if not candidate.exists():
-                        dst = candidate
-                        break
-                    i += 1
+            dst = folder_path / self._claim_name(folder_key, src, new, existing)
             try:
                 shutil.move(str(src), str(dst))
             except Exception as e:
                 conflicts.append((src, e))
+                continue
+            self._release_name(folder_key, src, dst, existing)
+            self._renamed(idx, iid, dst)
         if conflicts:
             messagebox.showerror('Errores', f'Ocurrieron errores con {len(conflicts)} archivos')
         else:
             messagebox.showinfo('Listo', 'Renombrado completado')
-        self.scan()
 
     def delete_duplicates(self):
-        groups = {}
-        for orig, disp, new, fh, sz, title, author in self.entries:
-            if not fh:
-                continue
-            groups.setdefault(fh, []).append((orig, sz))
-        dup_groups = {h: items for h, items in groups.items() if len(items) > 1}
+        # groups come from the hash index filled while inserting rows
+        dup_groups = {h: [(self.entries[i][0], self.entries[i][4]) for i in ids]
+                      for h, ids in self._dup_index.items() if len(ids) > 1}
         if not dup_groups:
             messagebox.showinfo('Duplicados', 'No se encontraron archivos duplicados')
             return
@@ -0,0 +1,224 @@
+"""Hash de contenido para detectar duplicados, con caché persistente.
+
+The digest is only used for equality, so the fastest available algorithm is
+picked: BLAKE3 (`blake3`), then XXH3-128 (`xxhash`), then the fastest of the
+stdlib SHA-256 / SHA-512 / BLAKE2b on this CPU (benchmarked once, see
+`_fastest_stdlib`).
+`HASH_ALGO` names the one in use; the index DB stores it next to each digest
+(`files.hash_algo`) so digests from different algorithms are never compared.
+
+Functions:
+- file_hash(path): hex digest of the file contents (None on read errors)
+- head_hash(path): digest of the first block only, a cheap duplicate prefilter
+- use_hash_algo(name): switch this process to another process's `HASH_ALGO`
+- cache_key(st): key for the hash cache built from an `os.stat_result`
+- load_hash_cache() / save_hash_cache(cache): persist `{key: digest}` as JSON
+"""
+from __future__ import annotations
+import functools
+import hashlib
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+
+CACHE_DIR = Path.home() / '.rename_archive'
+HASH_CACHE_PATH = CACHE_DIR / 'hashcache.json'
+# stdlib algorithm chosen on this machine; fixed once so every run (and the
+# indexer) produces comparable digests
+HASH_ALGO_PATH = CACHE_DIR / 'hashalgo.txt'
+_STDLIB_CANDIDATES = ('sha256', 'sha512', 'blake2b')
+_BENCH_SIZE = 4 << 20
+
+
+def _stdlib_factory(name):
+    try:
+        # not a security use: lets FIPS-restricted OpenSSL builds serve it too
+        hashlib.new(name, usedforsecurity=False)
+        return functools.partial(hashlib.new, name, usedforsecurity=False)
+    except TypeError:
+        # Python < 3.9
+        return functools.partial(hashlib.new, name)
+
+
+def _stored_algo():
+    try:
+        name = HASH_ALGO_PATH.read_text(encoding='ascii').strip()
+    except OSError:
+        return None
+    return name if name in _STDLIB_CANDIDATES else None
+
+
+def _fastest_stdlib() -> str:
+    """The fastest of `_STDLIB_CANDIDATES` here (measured once, then stored).
+
+    SHA-256 wins on CPUs with SHA extensions; without them SHA-512's and
+    BLAKE2b's 64-bit rounds usually move more bytes per second. Timings are
+    close, so a measurement is only used once it is stored: if the choice
+    cannot be saved, every process falls back to SHA-256 (`_STDLIB_CANDIDATES[0]`)
+    rather than measuring on its own.
+    """
+    name = _stored_algo()
+    if name:
+        return name
+    import time
+    data = bytes(_BENCH_SIZE)
+    best, best_t = _STDLIB_CANDIDATES[0], None
+    for name in _STDLIB_CANDIDATES:
+        h = _stdlib_factory(name)
+        h().update(data[:65536])
+        t0 = time.perf_counter()
+        h().update(data)
+        t = time.perf_counter() - t0
+        if best_t is None or t < best_t:
+            best, best_t = name, t
+    tmp = HASH_ALGO_PATH.with_name(f'{HASH_ALGO_PATH.name}.{os.getpid()}.tmp')
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(best, encoding='ascii')
+        # link() publishes the complete file and fails if another process
+        # (indexer, a second GUI) stored its choice meanwhile: then use that one
+        os.link(tmp, HASH_ALGO_PATH)
+    except FileExistsError:
+        best = _stored_algo() or _STDLIB_CANDIDATES[0]
+    except OSError:
+        best = _STDLIB_CANDIDATES[0]
+    try:
+        tmp.unlink()
+    except OSError:
+        pass
+    return best
+
+
+try:
+    from blake3 import blake3 as _new_hash
+    HASH_ALGO = 'blake3'
+
+    def _new_big_hash():
+        # big files are hashed with BLAKE3's own worker threads
+        return _new_hash(max_threads=_new_hash.AUTO)
+except ImportError:
+    try:
+        from xxhash import xxh3_128 as _new_hash
+        HASH_ALGO = 'xxh3_128'
+    except ImportError:
+        HASH_ALGO = _fastest_stdlib()
+        _new_hash = _stdlib_factory(HASH_ALGO)
+    _new_big_hash = _new_hash
+
+
+
+def use_hash_algo(name: str) -> None:
+    """Hash with `name` (a `HASH_ALGO` from another process) in this process.
+
+    Pool workers call it at start-up so their digests match the parent's
+    label; a name this process already uses is a no-op.
+    """
+    global HASH_ALGO, _new_hash, _new_big_hash
+    if name == HASH_ALGO:
+        return
+    if name not in _STDLIB_CANDIDATES:
+        raise ValueError(f'hash algorithm not available here: {name}')
+    HASH_ALGO = name
+    _new_hash = _new_big_hash = _stdlib_factory(name)
+
+
+# 1 MiB chunks amortize the per-call overhead of the Python read loop
+BUF_SIZE = 1 << 20
+HEAD_SIZE = 65536
+# from this size on, a multithreaded BLAKE3 pays for its thread start-up
+BIG_FILE_SIZE = 16 << 20
+# a 32-bit address space cannot map big files; read those in chunks
+_MMAP_MAX = (1 << 31) - 1 if sys.maxsize < (1 << 32) else 1 << 62
+
+
+def _fadvise(fd, advice_name):
+    """`os.posix_fadvise` over the whole file if the platform has it (not Windows/macOS)."""
+    advice = getattr(os, advice_name, None)
+    if advice is not None:
+        try:
+            os.posix_fadvise(fd, 0, 0, advice)
+        except OSError:
+            pass
+
+
+def file_hash(path, block_size=BUF_SIZE) -> str | None:
+    h = _new_hash()
+    try:
+        with open(path, 'rb') as fh:
+            fd = fh.fileno()
+            size = os.fstat(fd).st_size
+            if size <= block_size:
+                # one read is cheaper than setting up (and faulting in) a mapping
+                h.update(fh.read())
+                return h.hexdigest()
+            if size >= BIG_FILE_SIZE:
+                h = _new_big_hash()
+            # read front to back once: ask for a larger readahead now, and drop
+            # the pages afterwards so a scan does not flush the page cache
+            _fadvise(fd, 'POSIX_FADV_SEQUENTIAL')
+            try:
+                # mapping hands the page cache straight to the hasher, no read copies
+                if size <= _MMAP_MAX:
+                    try:
+                        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                            if hasattr(mm, 'madvise'):
+                                mm.madvise(mmap.MADV_SEQUENTIAL)
+                            h.update(mm)
+                        return h.hexdigest()
+                    except (OSError, ValueError, OverflowError):
+                        h = _new_big_hash() if size >= BIG_FILE_SIZE else _new_hash()
+                        fh.seek(0)
+                # one reused buffer: no new bytes object per chunk
+                buf = bytearray(block_size)
+                view = memoryview(buf)
+                while True:
+                    n = fh.readinto(buf)
+                    if not n:
+                        break
+                    h.update(view[:n])
+            finally:
+                _fadvise(fd, 'POSIX_FADV_DONTNEED')
+        return h.hexdigest()
+    except Exception:
+        return None
+
+
+def head_hash(path, nbytes=HEAD_SIZE) -> str | None:
+    h = _new_hash()
+    try:
+        with open(path, 'rb') as fh:
+            h.update(fh.read(nbytes))
+        return h.hexdigest()
+    except Exception:
+        return None
+
+
+def cache_key(st) -> str:
+    """(inode, mtime_ns, size): si no cambia, el contenido tampoco.
+
+    The algorithm is part of the key so digests from another backend are not reused.
+    """
+    return f'{HASH_ALGO}:{st.st_ino}:{st.st_mtime_ns}:{st.st_size}'
+
+
+def load_hash_cache() -> dict:
+    try:
+        with HASH_CACHE_PATH.open('r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def save_hash_cache(cache: dict) -> None:
+    """Write the cache atomically; failures are ignored (the cache is optional)."""
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = HASH_CACHE_PATH.with_suffix('.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(tmp, HASH_CACHE_PATH)
+    except Exception:
+        pass
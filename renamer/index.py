@@ -2,12 +2,32 @@
 
 Functions:
 - db_path(): path to data/index.db
-- files_in_folder(folder): yield dicts for files whose absolute path starts with `folder`
+- connect(): new sqlite3 connection to the index DB (WAL and tuned PRAGMAs)
+- apply_pragmas(conn): the same PRAGMAs for a connection opened elsewhere (the indexer)
+- shared_writer() / write_lock: one long-lived write connection shared across threads
+- folder_range(folder): path bounds for an indexed "files under folder" query
+- files_in_folder(folder): (path, size, sha256, title, authors) tuples for files whose absolute path starts with `folder`
+- find_files_by_hash(sha256) / find_files_by_hashes(hashes): index rows (dicts) with the given content hash(es)
+- library_copies({digest: path}): rows with those digests at other paths, via a temp-table join
+- stats_for_paths(cur, paths): (path, size, mtime, hash_algo) of the given indexed paths
+- digests_for_sizes(cur, sizes): indexed (path, size, mtime, digest) rows with those sizes
+- sizes_in_library(sizes): which of `sizes` occur in the index
+- ensure_hash_algo_column(conn): add `files.hash_algo` to DBs created before it existed
+
+The `sha256` column holds whichever digest `hashing.HASH_ALGO` produced and
+`hash_algo` names it (NULL on old rows means SHA-256). Lookups only return
+digests made with the current algorithm.
+
+The read helpers share one connection per thread (see `_conn`), so the GUI
+thread and each worker thread keep their own without reconnecting (and
+replaying the PRAGMAs) on every call.
 """
 from __future__ import annotations
 from pathlib import Path
 import sqlite3
-from typing import Iterator
+import threading
+
+from .hashing import HASH_ALGO
 
 ROOT = Path(__file__).resolve().parent.parent
 DB_PATH = ROOT / 'data' / 'index.db'
@@ -17,50 +37,229 @@ def db_exists() -> bool:
     return DB_PATH.exists()
 
 
-def _connect():
-    return sqlite3.connect(str(DB_PATH))
+# WAL lets the GUI read while the indexer writes, and NORMAL only syncs at
+# checkpoints (still safe in WAL mode); the rest trade memory for fewer reads.
+_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-65536',
+)
+
+
+# rows written before the column existed were hashed with SHA-256
+LEGACY_HASH_ALGO = 'sha256'
+# same digest algorithm as this process (see module docstring)
+_ALGO_MATCH = "COALESCE(hash_algo,'" + LEGACY_HASH_ALGO + "') = ?"
+_migrated = set()
+
+
+def ensure_hash_algo_column(conn: sqlite3.Connection) -> None:
+    cols = {row[1] for row in conn.execute('PRAGMA table_info(files)')}
+    if cols and 'hash_algo' not in cols:
+        conn.execute('ALTER TABLE files ADD COLUMN hash_algo TEXT')
+        conn.commit()
+
+
+def apply_pragmas(conn: sqlite3.Connection) -> None:
+    """Apply `_PRAGMAS` to `conn`; any the DB refuses keep their defaults."""
+    for pragma in _PRAGMAS:
+        try:
+            conn.execute(pragma)
+        except sqlite3.DatabaseError:
+            # e.g. WAL on a read-only or network filesystem: keep the defaults
+            pass
+
+
+def connect(check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open the index DB with the tuned PRAGMAs applied."""
+    conn = sqlite3.connect(str(DB_PATH), check_same_thread=check_same_thread)
+    apply_pragmas(conn)
+    if DB_PATH not in _migrated:
+        try:
+            ensure_hash_algo_column(conn)
+            _migrated.add(DB_PATH)
+        except sqlite3.DatabaseError:
+            pass
+    return conn
+
+
+_tls = threading.local()
+
+
+def _conn() -> sqlite3.Connection:
+    """This thread's reusable connection (reopened if DB_PATH changed).
+
+    sqlite3 connections must stay on the thread that made them, hence one per thread.
+    """
+    cached = getattr(_tls, 'conn', None)
+    if cached is not None and cached[0] == DB_PATH:
+        return cached[1]
+    if cached is not None:
+        cached[1].close()
+    conn = connect()
+    _tls.conn = (DB_PATH, conn)
+    return conn
+
+
+def folder_range(folder) -> tuple[str, str]:
+    """(low, high) bounds so that `path >= low AND path < high` selects paths under `folder`.
+
+    Unlike `LIKE 'folder%'` this range can use the index on `path` (LIKE is
+    case-insensitive, so SQLite scans the table), and `%`/`_` in folder
+    names are not wildcards.
+    """
+    prefix = str(folder).rstrip('/\\') + os_sep()
+    # the next string after every "prefix..." one: bump the separator
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+_writer = None
+# guards every use of the shared_writer() connection
+write_lock = threading.Lock()
 
 
-def files_in_folder(folder: Path) -> Iterator[dict]:
-    """Yield rows for files inside `folder`.
+def shared_writer() -> sqlite3.Connection:
+    """The GUI's one write connection, shared by its worker threads.
 
-    Each yielded dict contains: path, size, sha256, title, authors
+    Opened (and tuned) on first use and kept for later scans. Only use it while
+    holding `write_lock`, and never close it.
+    """
+    global _writer
+    with write_lock:
+        if _writer is None or _writer[0] != DB_PATH:
+            if _writer is not None:
+                _writer[1].close()
+            _writer = (DB_PATH, connect(check_same_thread=False))
+        return _writer[1]
+
+
+# digests from another algorithm come back as NULL, like a file not hashed yet
+_FOLDER_QUERY = ('SELECT path,size,CASE WHEN ' + _ALGO_MATCH + ' THEN sha256 END,title,authors '
+                 'FROM files WHERE path >= ? AND path < ? ORDER BY path')
+
+
+def files_in_folder(folder: Path) -> list[tuple]:
+    """Return rows for files inside `folder`.
+
+    Each row is a plain tuple: (path, size, sha256, title, authors), ordered by path;
+    sha256 is None unless it was computed with the current `HASH_ALGO`.
     """
     folder = Path(folder).resolve()
     if not db_exists():
-        return
-    conn = _connect()
-    cur = conn.cursor()
-    # Use parameterized LIKE to match paths under the folder
-    # Normalize to string with trailing separator to avoid prefix collisions
-    prefix = str(folder) + os_sep()
+        return []
+    cur = _conn().cursor()
     try:
-        cur.execute('SELECT path,size,sha256,title,authors FROM files WHERE path LIKE ? ORDER BY path', (prefix + '%',))
-    except Exception:
-        # Fallback: try without trailing separator
-        cur.execute('SELECT path,size,sha256,title,authors FROM files WHERE path LIKE ? ORDER BY path', (str(folder) + '%',))
-    for row in cur.fetchall():
-        path, size, sha, title, authors = row
-        yield {'path': path, 'size': size, 'sha256': sha, 'title': title, 'authors': authors}
-    conn.close()
+        cur.execute(_FOLDER_QUERY, (HASH_ALGO,) + folder_range(folder))
+        # one fetchall: rows stay tuples, no per-row dict
+        return cur.fetchall()
+    finally:
+        cur.close()
 
 
 def find_files_by_hash(sha256: str) -> list[dict]:
     """Return list of dicts for files with the given SHA256."""
     if not db_exists():
         return []
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute('SELECT path,size,sha256,title,authors FROM files WHERE sha256 = ?', (sha256,))
+    cur = _conn().execute('SELECT path,size,sha256,title,authors FROM files WHERE sha256 = ? AND ' + _ALGO_MATCH,
+                          (sha256, HASH_ALGO))
     rows = []
     for row in cur.fetchall():
         path, size, sha, title, authors = row
         rows.append({'path': path, 'size': size, 'sha256': sha, 'title': title, 'authors': authors})
-    conn.close()
     return rows
 
 
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER was 999 before 3.32
+_IN_CHUNK = 900
+
+
+def _select_in(cur, sql, values, extra=()):
+    """Run `sql` (with one `%s` for the IN list) over `values` in chunks; yield rows.
+
+    `extra` parameters are bound after the IN list.
+    """
+    for i in range(0, len(values), _IN_CHUNK):
+        chunk = values[i:i + _IN_CHUNK]
+        cur.execute(sql % ','.join('?' * len(chunk)), chunk + list(extra))
+        yield from cur.fetchall()
+
+
+def find_files_by_hashes(hashes) -> dict[str, list[dict]]:
+    """Like `find_files_by_hash` for many hashes: {sha256: [row dicts]}.
+
+    One `IN (...)` query per chunk of `_IN_CHUNK` hashes instead of one query per hash;
+    hashes with no match are absent from the result.
+    """
+    hashes = list(hashes)
+    if not hashes or not db_exists():
+        return {}
+    found = {}
+    sql = 'SELECT path,size,sha256,title,authors FROM files WHERE sha256 IN (%s) AND ' + _ALGO_MATCH
+    for path, size, sha, title, authors in _select_in(_conn().cursor(), sql, hashes, (HASH_ALGO,)):
+        found.setdefault(sha, []).append({'path': path, 'size': size, 'sha256': sha, 'title': title, 'authors': authors})
+    return found
+
+
+def library_copies(local) -> dict[str, list[dict]]:
+    """Index rows with the same content as local files, other than those files.
+
+    `local` maps digest -> local path. The digests go into a temp table that
+    is joined with `files` in one statement, whatever their number; the
+    result is {digest: [row dicts]}, without rows at the local file's own path.
+    """
+    if not local or not db_exists():
+        return {}
+    conn = _conn()
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS local_hashes(sha TEXT PRIMARY KEY, path TEXT)')
+    found = {}
+    try:
+        conn.executemany('INSERT OR REPLACE INTO local_hashes(sha,path) VALUES(?,?)', local.items())
+        cur = conn.execute('SELECT f.path,f.size,f.sha256,f.title,f.authors FROM local_hashes l '
+                           'JOIN files f ON f.sha256 = l.sha WHERE f.path != l.path AND ' + _ALGO_MATCH,
+                           (HASH_ALGO,))
+        for path, size, sha, title, authors in cur.fetchall():
+            found.setdefault(sha, []).append({'path': path, 'size': size, 'sha256': sha, 'title': title, 'authors': authors})
+    finally:
+        # the inserts were never committed: rolling back empties the temp table
+        conn.rollback()
+    return found
+
+
+def stats_for_paths(cur, paths):
+    """Yield (path, size, mtime, hash_algo) for those of `paths` in the index.
+
+    Runs on the caller's cursor (e.g. a writer's own connection); a missing
+    hash_algo is reported as `LEGACY_HASH_ALGO`.
+    """
+    sql = 'SELECT path,size,mtime,COALESCE(hash_algo,\'' + LEGACY_HASH_ALGO + '\') FROM files WHERE path IN (%s)'
+    yield from _select_in(cur, sql, list(paths))
+
+
+def digests_for_sizes(cur, sizes):
+    """Yield (path, size, mtime, sha256) of indexed files with one of `sizes`.
+
+    Only digests made with the current `HASH_ALGO`; runs on the caller's cursor.
+    """
+    sql = 'SELECT path,size,mtime,sha256 FROM files WHERE size IN (%s) AND sha256 IS NOT NULL AND ' + _ALGO_MATCH
+    yield from _select_in(cur, sql, list(sizes), (HASH_ALGO,))
+
+
+def sizes_in_library(sizes) -> set[int]:
+    """The subset of `sizes` that at least one indexed file has.
+
+    A file whose size is not in the index cannot have a copy there, so it
+    does not need hashing for a library comparison.
+    """
+    sizes = list(sizes)
+    if not sizes or not db_exists():
+        return set()
+    sql = 'SELECT DISTINCT size FROM files WHERE size IN (%s)'
+    return {row[0] for row in _select_in(_conn().cursor(), sql, sizes)}
+
+
 def os_sep() -> str:
-    # sqlite LIKE expects backslashes to match literally; return os-specific separator
+    # separator used in the stored (absolute) paths
     import os
     return os.sep
@@ -2,11 +2,13 @@
 
 import os
 import re
+import json
 import pickle
 import logging
 from pathlib import Path
 from .metadata import extract_metadata
-from .utils import normalize_authors, format_authors_for_filename, sanitize, guess_title_author_from_filename
+from .utils import normalize_authors, format_authors_for_filename, format_proposal, sanitize, guess_title_author_from_filename
+from .hashing import file_hash, CACHE_DIR
 
 # Optional ML dependencies
 try:
@@ -21,6 +23,9 @@ MODEL_DIR = Path(__file__).resolve().parent.parent / "data" / "models"
 VEC_PATH = MODEL_DIR / "vectorizer.pkl"
 KNN_PATH = MODEL_DIR / "knn.pkl"
 PROPS_PATH = MODEL_DIR / "proposals.pkl"
+SUGGEST_CACHE_PATH = CACHE_DIR / "suggestcache.json"
+# the oldest entries are dropped past this size when the cache is saved
+SUGGEST_CACHE_MAX = 20000
 
 _models_loaded = False
 _vec = None
@@ -87,23 +92,67 @@ def suggest_for_file(filepath: str | Path):
                     # try to parse the proposal back into author/title
                     # assuming "Author - Title" format
                     parts = best_proposal.split(' - ', 1)
+                    # stored proposals may hold '/' or ':'; callers rename with the result as is
+                    newname = sanitize(f"{best_proposal}{ext}")
                     if len(parts) == 2:
-                        return f"{best_proposal}{ext}", parts[1], parts[0]
-                    return f"{best_proposal}{ext}", None, None
+                        return newname, parts[1], parts[0]
+                    return newname, None, None
         except Exception:
             pass
 
     # Fallback construction
     t = sanitize(final_title) if final_title else ''
     a = format_authors_for_filename(normalize_authors(final_author), max_authors=3) if final_author else ''
+    return sanitize(format_proposal(a, t, ext, path.name)), final_title, final_author
 
-    if a and t:
-        new_name = f"{a} - {t}{ext}"
-    elif t:
-        new_name = f"{t}{ext}"
-    elif a:
-        new_name = f"{a}{ext}"
-    else:
-        new_name = path.name
 
-    return sanitize(new_name), final_title, final_author
+def process_file(path_str: str, cached_h=None, need_hash=True):
+    """Sugerencia + hash de un archivo: (path_str, new, title, author, file_h).
+
+    Module-level (and free of Tk) so the scan can run it in a process pool.
+    """
+    new, title, author = suggest_for_file(path_str)
+    file_h = cached_h
+    if file_h is None and need_hash:
+        file_h = file_hash(path_str)
+    return path_str, new, title, author, file_h
+
+
+def _models_stamp() -> str:
+    """Identifica la versión de los modelos (mtimes); las sugerencias cacheadas dependen de ella."""
+    try:
+        return ':'.join(str(p.stat().st_mtime_ns) for p in (VEC_PATH, KNN_PATH, PROPS_PATH))
+    except OSError:
+        return 'none'
+
+
+def suggest_cache_key(filepath, ident) -> str:
+    """`ident` is the content hash (or a `hashing.cache_key`); heuristics also use the name."""
+    return f"{ident}:{os.path.basename(filepath)}"
+
+
+def load_suggest_cache() -> dict:
+    """`{suggest_cache_key: [new, title, author]}`; empty if missing or built with other models."""
+    try:
+        with SUGGEST_CACHE_PATH.open('r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict) and data.get('models') == _models_stamp():
+            entries = data.get('entries')
+            return entries if isinstance(entries, dict) else {}
+    except Exception:
+        pass
+    return {}
+
+
+def save_suggest_cache(cache: dict) -> None:
+    """Write the cache atomically; failures are ignored (the cache is optional)."""
+    try:
+        if len(cache) > SUGGEST_CACHE_MAX:
+            cache = dict(list(cache.items())[-SUGGEST_CACHE_MAX:])
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = SUGGEST_CACHE_PATH.with_suffix('.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump({'models': _models_stamp(), 'entries': cache}, f)
+        os.replace(tmp, SUGGEST_CACHE_PATH)
+    except Exception:
+        pass
@@ -1,59 +1,98 @@
+import os
 import re
+import struct
 import zipfile
+import zlib
+import xml.etree.ElementTree as ET
 from pathlib import Path
 from .utils import normalize_authors
 
+try:
+    import fitz  # PyMuPDF
+    _HAS_FITZ = True
+except Exception:
+    _HAS_FITZ = False
 
-def extract_pdf_metadata(path):
-    # Try PyMuPDF (fitz) first as it is generally more robust
+try:
+    from lxml import etree
+    _HAS_LXML = True
+except ImportError:
+    _HAS_LXML = False
+
+_OPF_NS = {'dc': 'http://purl.org/dc/elements/1.1/'}
+
+# Patrones precompilados para las heurísticas de título/autor
+_BY_RE = re.compile(r'by\s+(.+)', re.IGNORECASE)
+_BY_POR_RE = re.compile(r'(?:by|por)\s+([\w\s\.]+)', re.IGNORECASE)
+_NAME_LINE_RE = re.compile(r'^[\w\-\., ]+$')
+# "Title:" / "Author:" en una sola pasada; el grupo 1 dice cuál de los dos es
+_FIELD_LINE_RE = re.compile(r'(title|author)\s*[:\-]\s*(.+)', re.IGNORECASE)
+
+# Leer el texto de la primera página cuando faltan metadatos obliga a decodificar
+# el contenido del PDF; sólo se hace si se activa y para archivos pequeños.
+ENABLE_TEXT_FALLBACK = False
+TEXT_FALLBACK_MAX_BYTES = 5 * 1024 * 1024
+
+
+def _want_text_fallback(path, title, author):
+    if not ENABLE_TEXT_FALLBACK or title or author:
+        return False
     try:
-        import fitz
-        doc = fitz.open(path)
-        meta = doc.metadata
-        title = meta.get('title')
-        author = meta.get('author')
-        if not title or not author:
-            # simple text extraction fallback for first page
-            # often title is first line, author is second
-             if doc.page_count > 0:
-                p = doc[0]
-                # get text blocks
-                blocks = p.get_text("blocks")
-                blocks.sort(key=lambda b: b[1]) # sort by vertical position
-                lines = []
-                for b in blocks:
-                    # block text; b[4]
-                    txt = b[4].strip()
-                    if txt:
-                        lines.append(txt)
-                if not title and lines:
-                    title = lines[0].split('\n')[0]
-                if not author and len(lines) > 1:
-                    # heuristic: look for "By X" or just second line
-                    sec = lines[1].replace('\n', ' ')
-                    m = re.search(r'(?:by|por)\s+([\w\s\.]+)', sec, flags=re.IGNORECASE)
-                    if m:
-                        author = m.group(1)
-                    else:
-                        author = sec
-        doc.close()
-        author = normalize_authors(author)
-        title = title.strip() if title else title
-        return (title, author)
-    except ImportError:
-        pass
-    except Exception:
-        pass
+        return os.path.getsize(path) < TEXT_FALLBACK_MAX_BYTES
+    except OSError:
+        return False
+
+
+def extract_pdf_metadata(path):
+    # PyMuPDF (fitz) first: doc.metadata only needs the trailer/info dict
+    if _HAS_FITZ:
+        try:
+            doc = fitz.open(path)
+            try:
+                meta = doc.metadata or {}
+                title = meta.get('title')
+                author = meta.get('author')
+                if _want_text_fallback(path, title, author) and doc.page_count > 0:
+                    # simple text extraction fallback for first page
+                    # often title is first line, author is second
+                    p = doc[0]
+                    # only the top half of the page is needed for title/author
+                    r = p.rect
+                    clip = fitz.Rect(r.x0, r.y0, r.x1, r.y0 + r.height / 2)
+                    blocks = p.get_text("blocks", clip=clip)
+                    blocks.sort(key=lambda b: b[1]) # sort by vertical position
+                    lines = []
+                    for b in blocks:
+                        # block text; b[4]
+                        txt = b[4].strip()
+                        if txt:
+                            lines.append(txt)
+                    if not title and lines:
+                        title = lines[0].split('\n')[0]
+                    if not author and len(lines) > 1:
+                        # heuristic: look for "By X" or just second line
+                        sec = lines[1].replace('\n', ' ')
+                        m = _BY_POR_RE.search(sec)
+                        if m:
+                            author = m.group(1)
+                        else:
+                            author = sec
+            finally:
+                doc.close()
+            author = normalize_authors(author)
+            title = title.strip() if title else title
+            return (title, author)
+        except Exception:
+            pass
 
     # Fallback to PyPDF2
     try:
         from PyPDF2 import PdfReader
         # suppress noisy messages from PyPDF2 by redirecting stderr temporarily
-        import os
         import contextlib
         with open(os.devnull, 'w') as devnull:
             with contextlib.redirect_stderr(devnull):
-                reader = PdfReader(path)
+                reader = PdfReader(path, strict=False)
         info = reader.metadata
         title = None
         author = None
@@ -82,7 +121,7 @@ def extract_pdf_metadata(path):
             author = None
         author = normalize_authors(author)
         title = title.strip() if title and isinstance(title, str) else title
-        if not title or not author:
+        if _want_text_fallback(path, title, author):
             try:
                 if len(reader.pages) > 0:
                     text = reader.pages[0].extract_text() or ''
@@ -91,11 +130,11 @@ def extract_pdf_metadata(path):
                         title = lines[0]
                     if not author and len(lines) > 1:
                         second = lines[1]
-                        m = re.search(r'by\s+(.+)', second, flags=re.IGNORECASE)
+                        m = _BY_RE.search(second)
                         if m:
                             author = m.group(1)
                         else:
-                            if re.match(r'^[\w\-\., ]+$', second):
+                            if _NAME_LINE_RE.match(second):
                                 author = second
             except Exception:
                 pass
@@ -117,10 +156,138 @@ def extract_docx_metadata(path):
         return (None, None)
 
 
+_CONTAINER_PATH = 'META-INF/container.xml'
+_EOCD_SIG = b'PK\x05\x06'
+_EOCD = struct.Struct('<4s4H2LH')
+_CD_HEADER = struct.Struct('<4s6H3L5H2L')
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+
+def _opf_path_from_container(cont):
+    try:
+        # try utf-8, else latin-1
+        try:
+            cont_s = cont.decode('utf-8')
+        except Exception:
+            cont_s = cont.decode('latin-1', errors='replace')
+        root = ET.fromstring(cont_s)
+        ns = {'c': 'urn:oasis:names:tc:opendocument:xmlns:container'}
+        rf = root.find('.//c:rootfile', ns)
+        if rf is not None:
+            return rf.get('full-path')
+    except Exception:
+        pass
+    return None
+
+
+def _read_epub_metadata_files(path):
+    """Lee sólo container.xml y el OPF de un EPUB sin construir un ZipFile.
+
+    Locates the end-of-central-directory record in the file tail, walks the
+    central directory and inflates just those two members. Returns
+    (container_bytes, opf_bytes); raises on anything unusual (ZIP64,
+    encryption, unknown compression) so the caller can fall back to zipfile.
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        tail_len = min(size, 65535 + _EOCD.size)
+        f.seek(size - tail_len)
+        tail = f.read(tail_len)
+        pos = tail.rfind(_EOCD_SIG)
+        if pos < 0 or pos + _EOCD.size > len(tail):
+            raise ValueError('end of central directory not found')
+        _, _, _, _, n_total, cd_size, cd_offset, _ = _EOCD.unpack_from(tail, pos)
+        if n_total == 0xFFFF or cd_offset == 0xFFFFFFFF:
+            raise ValueError('zip64 not supported')
+        f.seek(cd_offset)
+        cd = f.read(cd_size)
+        entries = {}
+        off = 0
+        while off + _CD_HEADER.size <= len(cd):
+            fields = _CD_HEADER.unpack_from(cd, off)
+            if fields[0] != b'PK\x01\x02':
+                raise ValueError('bad central directory entry')
+            flags, method, csize = fields[3], fields[4], fields[8]
+            name_len, extra_len, comment_len = fields[10], fields[11], fields[12]
+            start = off + _CD_HEADER.size
+            raw_name = cd[start:start + name_len]
+            name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437')
+            entries.setdefault(name, (flags, method, csize, fields[16]))
+            off = start + name_len + extra_len + comment_len
+
+        def read(name):
+            flags, method, csize, local_off = entries[name]
+            if flags & 0x1:
+                raise ValueError('encrypted member')
+            f.seek(local_off)
+            header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            if header[0] != b'PK\x03\x04':
+                raise ValueError('bad local header')
+            f.seek(header[9] + header[10], os.SEEK_CUR)
+            data = f.read(csize)
+            if method == 0:
+                return data
+            if method == 8:
+                return zlib.decompress(data, -15)
+            raise ValueError('unsupported compression')
+
+        container = read(_CONTAINER_PATH) if _CONTAINER_PATH in entries else None
+        opf_path = _opf_path_from_container(container) if container else None
+        if not opf_path:
+            opf_path = next((n for n in entries if n.endswith('.opf')), None)
+        opf = read(opf_path) if opf_path in entries else None
+    return container, opf
+
+
+def _read_epub_metadata_files_zipfile(path):
+    """Igual que `_read_epub_metadata_files` pero vía zipfile (más tolerante)."""
+    with zipfile.ZipFile(path) as z:
+        names = z.namelist()
+        container = z.read(_CONTAINER_PATH) if _CONTAINER_PATH in names else None
+        opf_path = _opf_path_from_container(container) if container else None
+        if not opf_path:
+            opf_path = next((n for n in names if n.endswith('.opf')), None)
+        opf = z.read(opf_path) if opf_path else None
+    return container, opf
+
+
+def _parse_opf(data):
+    """Devuelve (title, author) crudos del OPF; author une todos los dc:creator."""
+    if _HAS_LXML:
+        # XPath over the C tree instead of walking every element in Python
+        try:
+            root = etree.fromstring(data, parser=etree.XMLParser(recover=True))
+            title = root.findtext('.//dc:title', namespaces=_OPF_NS)
+            creators = [e.text for e in root.iterfind('.//dc:creator', namespaces=_OPF_NS) if e.text]
+            if title or creators:
+                return title, ', '.join(creators) or None
+        except Exception:
+            pass
+    # decode with fallback
+    try:
+        data_s = data.decode('utf-8')
+    except Exception:
+        data_s = data.decode('latin-1', errors='replace')
+    root = ET.fromstring(data_s)
+    title = None
+    author = None
+    for elem in root.iter():
+        tag = elem.tag.lower()
+        if tag.endswith('title') and not title:
+            title = elem.text
+        if tag.endswith('creator'):
+            if not author:
+                author = elem.text
+            else:
+                author = author + ', ' + (elem.text or '')
+    return title, author
+
+
 def extract_epub_metadata(path):
     try:
         from ebooklib import epub
-        import contextlib, os
+        import contextlib
         # suppress noisy stderr from underlying parsers
         with open(os.devnull, 'w') as devnull:
             with contextlib.redirect_stderr(devnull):
@@ -138,49 +305,12 @@ def extract_epub_metadata(path):
     except Exception:
         # Fallback: attempt tolerant ZIP/OPF parsing and liberal decoding
         try:
-            z = zipfile.ZipFile(path)
-            opf_path = None
-            if 'META-INF/container.xml' in z.namelist():
-                import xml.etree.ElementTree as ET
-                try:
-                    cont = z.read('META-INF/container.xml')
-                    # try utf-8, else latin-1
-                    try:
-                        cont_s = cont.decode('utf-8')
-                    except Exception:
-                        cont_s = cont.decode('latin-1', errors='replace')
-                    root = ET.fromstring(cont_s)
-                    ns = {'c': 'urn:oasis:names:tc:opendocument:xmlns:container'}
-                    rf = root.find('.//c:rootfile', ns)
-                    if rf is not None:
-                        opf_path = rf.get('full-path')
-                except Exception:
-                    opf_path = None
-            if not opf_path:
-                for name in z.namelist():
-                    if name.endswith('.opf'):
-                        opf_path = name
-                        break
-            if opf_path:
-                data = z.read(opf_path)
-                import xml.etree.ElementTree as ET
-                # decode with fallback
-                try:
-                    data_s = data.decode('utf-8')
-                except Exception:
-                    data_s = data.decode('latin-1', errors='replace')
-                root = ET.fromstring(data_s)
-                title = None
-                author = None
-                for elem in root.iter():
-                    tag = elem.tag.lower()
-                    if tag.endswith('title') and not title:
-                        title = elem.text
-                    if tag.endswith('creator'):
-                        if not author:
-                            author = elem.text
-                        else:
-                            author = author + ', ' + (elem.text or '')
+            try:
+                container, opf = _read_epub_metadata_files(path)
+            except Exception:
+                container, opf = _read_epub_metadata_files_zipfile(path)
+            if opf:
+                title, author = _parse_opf(opf)
                 author = normalize_authors(author)
                 return (title, author)
         except Exception:
@@ -191,22 +321,34 @@ def extract_epub_metadata(path):
 def extract_txt_metadata(path):
     try:
         with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-            raw = f.read(4000)
-            lines = [ln.strip() for ln in raw.splitlines() if ln.strip()]
+            # only the first 10 non-empty lines (within 4000 chars) are looked at
+            lines = []
+            budget = 4000
+            while budget > 0 and len(lines) < 10:
+                ln = f.readline(budget)
+                if not ln:
+                    break
+                budget -= len(ln)
+                for part in ln.splitlines():
+                    part = part.strip()
+                    if part:
+                        lines.append(part)
             title = None
             author = None
             for ln in lines[:10]:
-                m_t = re.match(r'Title\s*[:\-]\s*(.+)', ln, flags=re.IGNORECASE)
-                m_a = re.match(r'Author\s*[:\-]\s*(.+)', ln, flags=re.IGNORECASE)
-                if m_t and not title:
-                    title = m_t.group(1).strip()
-                if m_a and not author:
-                    author = m_a.group(1).strip()
+                m = _FIELD_LINE_RE.match(ln)
+                if not m:
+                    continue
+                if m.group(1)[0] in 'tT':
+                    if not title:
+                        title = m.group(2).strip()
+                elif not author:
+                    author = m.group(2).strip()
             if not title and lines:
                 title = lines[0]
             if not author and len(lines) > 1:
                 second = lines[1]
-                m = re.search(r'by\s+(.+)', second, flags=re.IGNORECASE)
+                m = _BY_RE.search(second)
                 if m:
                     author = m.group(1).strip()
             author = normalize_authors(author)
@@ -215,14 +357,17 @@ def extract_txt_metadata(path):
         return (None, None)
 
 
+_EXTRACTORS = {
+    '.pdf': extract_pdf_metadata,
+    '.docx': extract_docx_metadata,
+    '.epub': extract_epub_metadata,
+    '.txt': extract_txt_metadata,
+    '.md': extract_txt_metadata,
+}
+
+
 def extract_metadata(path: Path):
-    ext = path.suffix.lower()
-    if ext == '.pdf':
-        return extract_pdf_metadata(str(path))
-    if ext == '.docx':
-        return extract_docx_metadata(str(path))
-    if ext == '.epub':
-        return extract_epub_metadata(str(path))
-    if ext in ('.txt', '.md'):
-        return extract_txt_metadata(str(path))
-    return (None, None)
+    extractor = _EXTRACTORS.get(path.suffix.lower())
+    if extractor is None:
+        return (None, None)
+    return extractor(str(path))
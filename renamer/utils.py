@@ -1,5 +1,30 @@
 import re
 import os
+import functools
+
+# Patrones precompilados: estas funciones se llaman por cada archivo y autor
+_WS_RE = re.compile(r'\s+')
+# C0 control chars, DEL and characters invalid on Windows filenames, removed in one pass
+_ILLEGAL_TRANS = str.maketrans('', '', ''.join(map(chr, range(0x20))) + '\x7f<>:"/\\|?*')
+_ILLEGAL_SET = frozenset('<>:"/\\|?*')
+_RESERVED_RE = re.compile(r'^(con|prn|aux|nul|com\d|lpt\d)$', re.IGNORECASE)
+_AUTHOR_SPLIT_RE = re.compile(r'[;/\\|&]|\band\b|\by\b', re.IGNORECASE)
+_LASTFIRST_RE = re.compile(r'^([^,]+),\s*(.+)$')
+# limpieza de nombres de archivo en guess_title_author_from_filename
+_SEPARATORS_RE = re.compile(r'[._]+')
+_NOISE_WORDS_RE = re.compile(r'\b(Microsoft Word|Documento|Document|Scan|IMG|IMG_?\d+|Page_?\d+|Document1|Documento1)\b', re.IGNORECASE)
+_BRACKETED_RE = re.compile(r'\[[^\]]*\]|\([^\)]*\)|\{[^\}]*\}')
+_CF_RE = re.compile(r'\b(cf|cf\.|cf:)\b', re.IGNORECASE)
+_SINGLE_LETTER_RE = re.compile(r'\b[a-zA-Z]\b')
+_NON_WORD_RE = re.compile(r'[^\w\s\-]')
+
+
+def _is_clean(s: str) -> bool:
+    """True si `sanitize(s)` devolvería `s` tal cual (caso habitual)."""
+    return (0 < len(s) <= 200 and s.isprintable() and '  ' not in s
+            and s[0] != ' ' and s[-1] not in ' .'
+            and _ILLEGAL_SET.isdisjoint(s) and not _RESERVED_RE.match(s))
+
 
 def sanitize(s: str) -> str:
     """Return a filesystem-safe, human-friendly string.
@@ -10,18 +35,17 @@ def sanitize(s: str) -> str:
     """
     if not s:
         return "Unknown"
-    # normalize whitespace
-    s = re.sub(r'\s+', ' ', s)
-    # remove C0 control chars and DEL
-    s = re.sub(r'[\x00-\x1f\x7f]', '', s)
-    # remove characters invalid on Windows filenames
-    s = re.sub(r'[<>:\\"/\\|?*]', '', s)
-    # remove other problematic characters (unprintable, unusual separators)
-    s = s.strip()
+    if _is_clean(s):
+        return s
+    # normalize whitespace (printable text without double spaces is already normal)
+    if not s.isprintable() or '  ' in s:
+        s = _WS_RE.sub(' ', s)
+    # remove C0 control chars, DEL and characters invalid on Windows filenames
+    s = s.translate(_ILLEGAL_TRANS)
     # Windows forbids names that end with space or dot
-    s = s.rstrip(' .')
+    s = s.strip().rstrip(' .')
     # reserved device names on Windows (CON, PRN, AUX, NUL, COM1..COM9, LPT1..LPT9)
-    if re.match(r'^(con|prn|aux|nul|com\d|lpt\d)$', s.strip(), flags=re.IGNORECASE):
+    if _RESERVED_RE.match(s):
         s = '_' + s
     # limit length to reasonable filename size
     if len(s) > 200:
@@ -35,6 +59,19 @@ def normalize_authors(author_field):
     """Normaliza campo de autores a cadena unificada "Nombre Apellido, Nombre2 Apellido2"."""
     if not author_field:
         return None
+    # the same authors repeat across a library: memoize on a hashable form
+    if isinstance(author_field, list):
+        author_field = tuple(author_field)
+    elif not isinstance(author_field, (str, tuple)):
+        author_field = str(author_field)
+    try:
+        return _normalize_authors_cached(author_field)
+    except TypeError:
+        return _normalize_authors_cached.__wrapped__(author_field)
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_authors_cached(author_field):
     items = []
     if isinstance(author_field, (list, tuple)):
         for a in author_field:
@@ -42,7 +79,7 @@ def normalize_authors(author_field):
                 items.append(a.strip())
     else:
         s = str(author_field).strip()
-        parts = re.split(r'[;/\\|&]|\band\b|\by\b', s, flags=re.IGNORECASE)
+        parts = _AUTHOR_SPLIT_RE.split(s)
         parts = [p.strip() for p in parts if p and p.strip()]
         if len(parts) > 1:
             items = parts
@@ -66,14 +103,14 @@ def normalize_authors(author_field):
     for it in items:
         if not it:
             continue
-        m = re.match(r'^([^,]+),\s*(.+)$', it)
+        m = _LASTFIRST_RE.match(it)
         if m:
             last = m.group(1).strip()
             first = m.group(2).strip()
             name = f"{first} {last}"
         else:
             name = it
-        name = re.sub(r'\s+', ' ', name).strip()
+        name = _WS_RE.sub(' ', name).strip()
         normalized.append(name)
     seen = set()
     out = []
@@ -88,6 +125,22 @@ def format_authors_for_filename(auth_norm, max_authors=3):
     """Formatea autores para incluir en nombre de archivo, con límite de max_authors."""
     if not auth_norm:
         return ''
+    # "A, B" ya limpio y dentro del límite: el resultado sería la misma cadena
+    if (isinstance(auth_norm, str) and auth_norm.count(',') < max_authors
+            and all(_is_clean(a) and ',' not in a for a in auth_norm.split(', '))):
+        return auth_norm
+    if isinstance(auth_norm, list):
+        auth_norm = tuple(auth_norm)
+    if isinstance(auth_norm, (str, tuple)):
+        try:
+            return _format_authors_cached(auth_norm, max_authors)
+        except TypeError:
+            pass
+    return _format_authors_cached.__wrapped__(auth_norm, max_authors)
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_authors_cached(auth_norm, max_authors):
     if isinstance(auth_norm, str):
         authors = [a.strip() for a in auth_norm.split(',') if a.strip()]
     elif isinstance(auth_norm, (list, tuple)):
@@ -102,17 +155,61 @@ def format_authors_for_filename(auth_norm, max_authors=3):
     return ', '.join(authors[:max_authors]) + ' et al.'
 
 
+def iter_files(root):
+    """Recorre `root` recursivamente y genera un `os.DirEntry` por archivo.
+
+    Same set as `Path(root).rglob('*')` filtered to files (symlinked
+    directories are not entered), but the type of each entry comes from the
+    directory listing, so no extra stat per path. Unreadable directories are
+    skipped.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+                except OSError:
+                    continue
+
+
+# nombre propuesto, indexado por (hay autor) << 1 | (hay título)
+_FORMATTERS = (
+    lambda a, t, ext, name: name,
+    lambda a, t, ext, name: f"{t}{ext}",
+    lambda a, t, ext, name: f"{a}{ext}",
+    lambda a, t, ext, name: f"{a} - {t}{ext}",
+)
+
+
+def format_proposal(a, t, ext, name):
+    """"Autor - Título.ext" con las partes que haya; `name` si no hay ninguna."""
+    return _FORMATTERS[(bool(a) << 1) | bool(t)](a, t, ext, name)
+
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+
+# many files share a size (or a rounded one); the string is built once per value
+@functools.lru_cache(maxsize=8192)
 def human_readable_size(n):
     """Convierte tamaño en bytes a formato legible (KB, MB, GB...)."""
     try:
         n = int(n)
     except Exception:
         return ''
-    for unit in ['B','KB','MB','GB','TB']:
-        if n < 1024.0:
-            return f"{n:.0f} {unit}"
-        n /= 1024.0
-    return f"{n:.0f} PB"
+    if n < 1024:
+        return f"{n} B"
+    # each unit is 10 more bits
+    k = min((n.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    return f"{n / (1 << (10 * k)):.0f} {_SIZE_UNITS[k]}"
 
 
 def guess_title_author_from_filename(filename):
@@ -129,20 +226,20 @@ def guess_title_author_from_filename(filename):
             return ''
         t = text
         # normalize separators
-        t = re.sub(r'[._]+', ' ', t)
+        t = _SEPARATORS_RE.sub(' ', t)
         t = t.replace('—', '-').replace('–', '-')
         # remove common noise tokens and words
-        t = re.sub(r'\b(Microsoft Word|Documento|Document|Scan|IMG|IMG_?\d+|Page_?\d+|Document1|Documento1)\b', '', t, flags=re.IGNORECASE)
+        t = _NOISE_WORDS_RE.sub('', t)
         # remove bracketed sections
-        t = re.sub(r'\[[^\]]*\]|\([^\)]*\)|\{[^\}]*\}', '', t)
+        t = _BRACKETED_RE.sub('', t)
         # remove stray 'cf', 'cf.' and similar references
-        t = re.sub(r'\b(cf|cf\.|cf:)\b', '', t, flags=re.IGNORECASE)
+        t = _CF_RE.sub('', t)
         # remove standalone single letters (likely artifacts)
-        t = re.sub(r'\b[a-zA-Z]\b', '', t)
+        t = _SINGLE_LETTER_RE.sub('', t)
         # remove long runs of non-word characters
-        t = re.sub(r'[^\w\s\-]', ' ', t)
+        t = _NON_WORD_RE.sub(' ', t)
         # collapse multiple separators/spaces
-        t = re.sub(r'\s+', ' ', t)
+        t = _WS_RE.sub(' ', t)
         t = t.strip(' -_.,')
         return t.strip()
 
@@ -1,4 +1,5 @@
 import hashlib
+import os
 import sys
 from pathlib import Path
 
@@ -10,17 +11,25 @@ if not folder.exists():
 
 hash_map = {}
 errors = []
-for p in folder.iterdir():
-    if p.is_file():
-        try:
-            h = hashlib.sha256()
-            with p.open('rb') as fh:
-                for chunk in iter(lambda: fh.read(65536), b''):
-                    h.update(chunk)
-            digest = h.hexdigest()
-            hash_map.setdefault(digest, []).append(p)
-        except Exception as e:
-            errors.append((p, str(e)))
+# 1 MiB buffer reused for every file
+buf = bytearray(1 << 20)
+view = memoryview(buf)
+# scandir: the file type comes from the directory listing, no stat per entry
+with os.scandir(folder) as it:
+    files = [entry.path for entry in it if entry.is_file()]
+for p in files:
+    try:
+        h = hashlib.sha256()
+        with open(p, 'rb') as fh:
+            while True:
+                n = fh.readinto(buf)
+                if not n:
+                    break
+                h.update(view[:n])
+        digest = h.hexdigest()
+        hash_map.setdefault(digest, []).append(p)
+    except Exception as e:
+        errors.append((p, str(e)))
 
 print('\nDuplicate groups (by SHA256):')
 found = 0
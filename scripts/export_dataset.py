@@ -7,7 +7,6 @@ Requirements: assumes `data/index.db` created by `scripts/indexer.py` is present
 """
 from __future__ import annotations
 import sys
-import os
 import sqlite3
 import csv
 import json
@@ -19,6 +18,7 @@ ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(ROOT))
 
 from renamer.utils import normalize_authors, format_authors_for_filename, guess_title_author_from_filename
+from renamer.index import folder_range
 
 DB_PATH = ROOT / 'data' / 'index.db'
 
@@ -60,8 +60,9 @@ def export(folder: Path, out_csv: Path, out_jsonl: Path, limit: int = 0, min_tex
         return 1
     conn = sqlite3.connect(str(DB_PATH))
     cur = conn.cursor()
-    prefix = str(folder.resolve()) + os.sep
-    cur.execute('SELECT id,path,size,title,authors,needs_ocr FROM files WHERE path LIKE ? ORDER BY path', (prefix + '%',))
+    # a path range uses the index on `path`; LIKE would scan the whole table
+    cur.execute('SELECT id,path,size,title,authors,needs_ocr FROM files WHERE path >= ? AND path < ? ORDER BY path',
+                folder_range(folder.resolve()))
     rows = cur.fetchall()
     print(f'Found {len(rows)} indexed files under {folder}')
     out_csv.parent.mkdir(parents=True, exist_ok=True)
@@ -9,7 +9,6 @@ from __future__ import annotations
 import sys
 import os
 import sqlite3
-import hashlib
 from pathlib import Path
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -37,18 +36,16 @@ sys.path.insert(0, str(ROOT))
 
 # reuse existing extractors
 from renamer.metadata import extract_metadata
+from renamer.utils import iter_files
 from renamer.convert import _extract_text_from_docx, _extract_text_from_html, _extract_text_from_txt
-
-BUF_SIZE = 65536
+from renamer.hashing import file_hash, HASH_ALGO
+from renamer.index import apply_pragmas, ensure_hash_algo_column, folder_range, LEGACY_HASH_ALGO
 
 
 def ensure_db():
     DB_DIR.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
-    try:
-        conn.execute('PRAGMA journal_mode=WAL;')
-    except Exception:
-        pass
+    apply_pragmas(conn)
     cur = conn.cursor()
     cur.execute('''
     CREATE TABLE IF NOT EXISTS files (
@@ -58,6 +55,7 @@ def ensure_db():
         size INTEGER,
         mtime REAL,
         sha256 TEXT,
+        hash_algo TEXT,
         title TEXT,
         authors TEXT,
         needs_ocr INTEGER DEFAULT 0,
@@ -70,6 +68,8 @@ def ensure_db():
         text TEXT,
         FOREIGN KEY(file_id) REFERENCES files(id)
     )''')
+    # DBs from before hash_algo existed get the column (NULL = SHA-256)
+    ensure_hash_algo_column(conn)
     cur.execute('CREATE INDEX IF NOT EXISTS idx_files_sha ON files(sha256)')
     cur.execute('CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(mtime)')
     conn.commit()
@@ -79,25 +79,13 @@ def ensure_db():
 
 
 def _open_db_connection():
+    # WAL so the GUI can read while this writes; synchronous=NORMAL syncs
+    # only at checkpoints (same PRAGMAs as the GUI's connections)
     conn = sqlite3.connect(DB_PATH)
-    try:
-        conn.execute('PRAGMA journal_mode=WAL;')
-    except Exception:
-        pass
+    apply_pragmas(conn)
     return conn
 
 
-def file_sha256(path: Path) -> str | None:
-    h = hashlib.sha256()
-    try:
-        with path.open('rb') as f:
-            for chunk in iter(lambda: f.read(BUF_SIZE), b''):
-                h.update(chunk)
-        return h.hexdigest()
-    except Exception:
-        return None
-
-
 def _extract_text_from_pdf(path: Path, max_pages: int = 4):
     """Devuelve (partes, needs_ocr) tomando las primeras páginas."""
     parts = []
@@ -154,27 +142,23 @@ def extract_text_for_index(path: Path):
         return [], False
 
 
-def index_file(root_folder: Path, path: Path, force_reindex=False):
-    rel = str(path.relative_to(root_folder))
-    stat = None
-    try:
-        stat = path.stat()
-    except Exception:
-        return False, 'stat_failed'
-    size = stat.st_size
-    mtime = stat.st_mtime
-    # Open a dedicated DB connection for this thread/task
-    conn = _open_db_connection()
-    cur = conn.cursor()
-    cur.execute('SELECT id,size,mtime,sha256 FROM files WHERE path=?', (str(path),))
-    row = cur.fetchone()
-    if row and not force_reindex:
-        fid, old_size, old_mtime, old_sha = row
-        if old_size == size and abs(old_mtime - mtime) < 1.0:
-            conn.close()
-            return False, 'skipped'
-    # compute sha256
-    sha = file_sha256(path)
+# walk_and_index's single writer commits once per this many indexed files
+_COMMIT_EVERY = 200
+
+
+def _is_current(row, st, force_reindex=False):
+    """True if `row` ((size, mtime, hash_algo) from the DB, or None) still describes the file."""
+    if not row or force_reindex:
+        return False
+    old_size, old_mtime, old_algo = row
+    # a digest from another hash algorithm would never match the GUI's
+    return old_size == st.st_size and abs(old_mtime - st.st_mtime) < 1.0 and (old_algo or LEGACY_HASH_ALGO) == HASH_ALGO
+
+
+def _read_file(path: Path):
+    """(sha, title, authors, text blocks, needs_ocr) de `path`; no toca la BD (corre en el pool)."""
+    # compute content hash (same algorithm as the GUI scan so digests compare)
+    sha = file_hash(path)
     title, authors = (None, None)
     try:
         meta = extract_metadata(path)
@@ -200,50 +184,102 @@ def index_file(root_folder: Path, path: Path, force_reindex=False):
             authors = None
     # extract text blocks (limit to first 10 blocks and first 5000 chars cada uno)
     parts, needs_ocr = extract_text_for_index(path)
-    parts = parts[:10]
+    return sha, title, authors, parts[:10], needs_ocr
+
 
-    # insert or update file row
+def _write_file(cur, root_folder: Path, path: Path, st, file_id, data):
+    """Insert or update the row (and text blocks) of `path`; the caller commits."""
+    sha, title, authors, parts, needs_ocr = data
+    rel = str(path.relative_to(root_folder))
     now = datetime.utcnow().isoformat()
-    if row:
-        cur.execute('''UPDATE files SET relpath=?, size=?, mtime=?, sha256=?, title=?, authors=?, needs_ocr=?, indexed_at=? WHERE id=?''',
-                    (rel, size, mtime, sha, title, authors, 1 if needs_ocr else 0, now, row[0]))
-        fid = row[0]
-        cur.execute('DELETE FROM texts WHERE file_id=?', (fid,))
+    if file_id is not None:
+        cur.execute('''UPDATE files SET relpath=?, size=?, mtime=?, sha256=?, hash_algo=?, title=?, authors=?, needs_ocr=?, indexed_at=? WHERE id=?''',
+                    (rel, st.st_size, st.st_mtime, sha, HASH_ALGO, title, authors, 1 if needs_ocr else 0, now, file_id))
+        cur.execute('DELETE FROM texts WHERE file_id=?', (file_id,))
     else:
-        cur.execute('''INSERT OR REPLACE INTO files(path,relpath,size,mtime,sha256,title,authors,needs_ocr,indexed_at) VALUES(?,?,?,?,?,?,?,?,?)''',
-                    (str(path), rel, size, mtime, sha, title, authors, 1 if needs_ocr else 0, now))
-        fid = cur.lastrowid
-    for i, block in enumerate(parts):
-        if not block:
-            continue
-        text = str(block)[:5000]
-        cur.execute('INSERT INTO texts(file_id,block_index,text) VALUES(?,?,?)', (fid, i, text))
-    conn.commit()
-    conn.close()
+        cur.execute('''INSERT OR REPLACE INTO files(path,relpath,size,mtime,sha256,hash_algo,title,authors,needs_ocr,indexed_at) VALUES(?,?,?,?,?,?,?,?,?,?)''',
+                    (str(path), rel, st.st_size, st.st_mtime, sha, HASH_ALGO, title, authors, 1 if needs_ocr else 0, now))
+        file_id = cur.lastrowid
+    cur.executemany('INSERT INTO texts(file_id,block_index,text) VALUES(?,?,?)',
+                    [(file_id, i, str(block)[:5000]) for i, block in enumerate(parts) if block])
+
+
+def index_file(root_folder: Path, path: Path, force_reindex=False):
+    """Indexa un solo archivo con su propia conexión y commit (walk_and_index agrupa)."""
+    try:
+        st = path.stat()
+    except Exception:
+        return False, 'stat_failed'
+    conn = _open_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute('SELECT id,size,mtime,hash_algo FROM files WHERE path=?', (str(path),))
+        row = cur.fetchone()
+        if _is_current(row and row[1:], st, force_reindex):
+            return False, 'skipped'
+        _write_file(cur, root_folder, path, st, row[0] if row else None, _read_file(path))
+        conn.commit()
+    finally:
+        conn.close()
     return True, 'indexed'
 
 
 def walk_and_index(root_folder: Path, workers=6, force_reindex=False):
+    """Index every file under `root_folder`.
+
+    Hashing and extraction run on a thread pool (file I/O and hashing release
+    the GIL); this thread is the only DB writer and commits every
+    `_COMMIT_EVERY` files instead of once per file.
+    """
     # ensure DB/tables exist
     ensure_db()
-    files = []
-    for p in root_folder.rglob('*'):
-        if p.is_file():
-            files.append(p)
-    total = len(files)
+    entries = list(iter_files(root_folder))
+    total = len(entries)
     print(f'Found {total} files; indexing with {workers} workers')
-    with ThreadPoolExecutor(max_workers=workers) as ex:
-        futures = {ex.submit(index_file, root_folder, p, force_reindex): p for p in files}
-        done = 0
-        for fut in as_completed(futures):
-            p = futures[fut]
+    done = 0
+
+    def report(p, ok, msg):
+        nonlocal done
+        done += 1
+        if done % 50 == 0 or not ok:
+            print(f'[{done}/{total}] {p} -> {msg}')
+
+    conn = _open_db_connection()
+    try:
+        cur = conn.cursor()
+        # everything already indexed under the folder, in one range query
+        cur.execute('SELECT path,id,size,mtime,hash_algo FROM files WHERE path >= ? AND path < ?', folder_range(root_folder))
+        known = {row[0]: row[1:] for row in cur.fetchall()}
+        todo = []
+        for entry in entries:
+            p = Path(entry.path)
             try:
-                ok, msg = fut.result()
-            except Exception as e:
-                ok, msg = False, str(e)
-            done += 1
-            if done % 50 == 0 or not ok:
-                print(f'[{done}/{total}] {p} -> {msg}')
+                st = entry.stat()
+            except OSError:
+                report(p, False, 'stat_failed')
+                continue
+            row = known.get(entry.path)
+            if _is_current(row and row[1:], st, force_reindex):
+                report(p, False, 'skipped')
+                continue
+            todo.append((p, st, row[0] if row else None))
+        written = 0
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = {ex.submit(_read_file, p): (p, st, file_id) for p, st, file_id in todo}
+            for fut in as_completed(futures):
+                p, st, file_id = futures[fut]
+                try:
+                    _write_file(cur, root_folder, p, st, file_id, fut.result())
+                    ok, msg = True, 'indexed'
+                    written += 1
+                    if written % _COMMIT_EVERY == 0:
+                        conn.commit()
+                except Exception as e:
+                    ok, msg = False, str(e)
+                report(p, ok, msg)
+        conn.commit()
+    finally:
+        conn.close()
     print('Indexing completed')
 
 